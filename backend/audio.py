@@ -0,0 +1,191 @@
+"""
+Narration audio processing for /upload-audio.
+
+Uploaded narration is transcoded with ffmpeg to mono, constant-bitrate MP3
+capped at AUDIO_BITRATE_KBPS. Constant bitrate keeps byte offsets proportional
+to time, so browsers can start playback and seek with HTTP range requests
+(which Supabase Storage serves) instead of downloading the whole file. The
+duration and a fixed-size waveform peak list are computed once at upload time
+from a streamed low-rate decode and stored next to the audio URL.
+
+ffmpeg is taken from FFMPEG_BINARY, the binary bundled with the imageio-ffmpeg
+package, or the PATH, in that order. Without any of them uploads are stored
+unchanged, as before.
+"""
+import os
+import shutil
+import subprocess
+
+import numpy as np
+
+AUDIO_BITRATE_KBPS = int(os.environ.get('AUDIO_BITRATE_KBPS', '64'))
+AUDIO_SAMPLE_RATE = 44100
+MIN_BITRATE_KBPS = 32
+WAVEFORM_PEAKS = 200
+# Sample rate for the analysis decode; plenty for duration and a coarse waveform.
+ANALYSIS_SAMPLE_RATE = 8000
+ANALYSIS_BLOCK_SAMPLES = 400  # 50 ms blocks at 8 kHz
+TRANSCODE_TIMEOUT_SECONDS = 300
+# ffmpeg messages that mean the input itself is broken rather than the server's ffmpeg.
+DECODE_ERROR_MARKERS = ('Invalid data found when processing input', 'Error while decoding')
+
+
+class AudioDecodeError(Exception):
+    """Raised when ffmpeg cannot decode an upload as audio; the client sent a bad file."""
+
+
+def find_ffmpeg():
+    """Returns the path of an ffmpeg binary, or None if none is available."""
+    configured = os.environ.get('FFMPEG_BINARY')
+    if configured:
+        return configured
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return shutil.which('ffmpeg')
+
+
+def transcode_audio(input_path, output_path, ffmpeg=None):
+    """
+    Transcodes any audio file ffmpeg can read into mono CBR MP3 at AUDIO_BITRATE_KBPS.
+
+    Args:
+        input_path (str): Uploaded audio file.
+        output_path (str): Where to write the MP3.
+        ffmpeg (str): ffmpeg binary; looked up with find_ffmpeg() if omitted.
+    """
+    ffmpeg = ffmpeg or find_ffmpeg()
+    if not ffmpeg:
+        raise Exception("ffmpeg is not available for audio transcoding.")
+
+    has_audio, source_kbps = probe_audio(input_path, ffmpeg)
+    if not has_audio:
+        raise AudioDecodeError("The uploaded file has no audio ffmpeg can decode.")
+
+    # Never spend more bits than the source had, but stay at or above MP3's 32 kbps floor for 44.1 kHz.
+    bitrate = max(MIN_BITRATE_KBPS, min(AUDIO_BITRATE_KBPS, source_kbps)) if source_kbps else AUDIO_BITRATE_KBPS
+
+    command = [
+        ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+        '-i', input_path,
+        '-vn', '-map_metadata', '-1',
+        '-ac', '1', '-ar', str(AUDIO_SAMPLE_RATE),
+        '-c:a', 'libmp3lame', '-b:a', f"{bitrate}k",
+        output_path,
+    ]
+    result = subprocess.run(command, capture_output=True, timeout=TRANSCODE_TIMEOUT_SECONDS)
+    if result.returncode != 0 or not os.path.exists(output_path):
+        stderr = result.stderr.decode('utf-8', 'replace').strip()
+        if any(marker in stderr for marker in DECODE_ERROR_MARKERS):
+            raise AudioDecodeError(f"The uploaded audio could not be decoded: {stderr[-500:]}")
+        raise Exception(f"Audio transcoding failed: {stderr[-500:]}")
+    return bitrate
+
+
+def probe_audio(input_path, ffmpeg):
+    """
+    Reads what ffmpeg reports about a file.
+
+    Returns:
+        tuple: (bool, int or None) - whether it has an audio stream and its overall bitrate in kbps.
+    """
+    result = subprocess.run([ffmpeg, '-hide_banner', '-i', input_path], capture_output=True, timeout=60)
+    has_audio = False
+    bitrate = None
+    for line in result.stderr.decode('utf-8', 'replace').splitlines():
+        if 'Stream #' in line and 'Audio:' in line:
+            has_audio = True
+        if 'bitrate:' in line and bitrate is None:
+            value = line.split('bitrate:')[1].strip().split(' ')[0]
+            if value.isdigit():
+                bitrate = int(value)
+    return has_audio, bitrate
+
+
+def analyse_audio(path, peaks=WAVEFORM_PEAKS, ffmpeg=None):
+    """
+    Computes duration and waveform peaks by streaming a low-rate mono decode through a pipe.
+
+    Only one peak per ANALYSIS_BLOCK_SAMPLES block is kept while reading, so memory
+    stays small however long the recording is.
+
+    Args:
+        path (str): Audio file to analyse.
+        peaks (int): Number of peak values to return.
+        ffmpeg (str): ffmpeg binary; looked up with find_ffmpeg() if omitted.
+
+    Returns:
+        dict: {"duration_seconds": float, "waveform_peaks": [float in 0..1, ...]}
+    """
+    ffmpeg = ffmpeg or find_ffmpeg()
+    if not ffmpeg:
+        raise Exception("ffmpeg is not available for audio analysis.")
+
+    command = [ffmpeg, '-hide_banner', '-loglevel', 'error', '-i', path,
+               '-vn', '-ac', '1', '-ar', str(ANALYSIS_SAMPLE_RATE), '-f', 's16le', '-']
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    block_bytes = ANALYSIS_BLOCK_SAMPLES * 2
+    block_peaks = []
+    total_samples = 0
+    pending = b''
+
+    def add_blocks(data):
+        samples = np.frombuffer(data, dtype='<i2').astype(np.int32)
+        padded = -samples.size % ANALYSIS_BLOCK_SAMPLES
+        blocks = np.abs(np.pad(samples, (0, padded))).reshape(-1, ANALYSIS_BLOCK_SAMPLES)
+        block_peaks.extend(blocks.max(axis=1).tolist())
+        return samples.size
+
+    try:
+        while True:
+            chunk = process.stdout.read(block_bytes * 64)
+            if not chunk:
+                break
+            pending += chunk
+            # Only whole blocks are processed; a partial pipe read waits for the rest of its block.
+            usable = len(pending) - len(pending) % block_bytes
+            if usable:
+                total_samples += add_blocks(pending[:usable])
+                pending = pending[usable:]
+        tail = len(pending) - len(pending) % 2
+        if tail:
+            total_samples += add_blocks(pending[:tail])
+    finally:
+        process.stdout.close()
+        process.wait(timeout=TRANSCODE_TIMEOUT_SECONDS)
+
+    if process.returncode != 0:
+        raise Exception("Audio analysis failed: ffmpeg could not decode the file.")
+
+    waveform = []
+    if block_peaks:
+        block_peaks = np.asarray(block_peaks, dtype=np.float32) / 32768.0
+        buckets = np.array_split(block_peaks, min(peaks, block_peaks.size))
+        waveform = [round(float(bucket.max()), 3) for bucket in buckets]
+
+    return {
+        'duration_seconds': round(total_samples / float(ANALYSIS_SAMPLE_RATE), 3),
+        'waveform_peaks': waveform,
+    }
+
+
+def process_narration(input_path, output_path):
+    """
+    Transcodes an uploaded narration file and measures it.
+
+    Returns:
+        tuple: (str, dict) - path of the file to upload (the original if ffmpeg is
+            unavailable) and metadata: bitrate_kbps, duration_seconds, waveform_peaks.
+    """
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        print("    [audio] ⚠️ ffmpeg not available; storing narration without transcoding.")
+        return input_path, {'bitrate_kbps': None, 'duration_seconds': None, 'waveform_peaks': None}
+
+    bitrate = transcode_audio(input_path, output_path, ffmpeg)
+    metadata = analyse_audio(output_path, ffmpeg=ffmpeg)
+    metadata['bitrate_kbps'] = bitrate
+    print(f"    [audio] ✅ Transcoded narration to {bitrate} kbps MP3: {metadata['duration_seconds']}s, "
+          f"{os.path.getsize(input_path)} -> {os.path.getsize(output_path)} bytes.")
+    return output_path, metadata
@@ -0,0 +1,270 @@
+"""
+Offline batch stitcher.
+
+Re-runs `stitch_images` over a whole library of room image sets outside the
+Flask request cycle, e.g. after the crop logic or output format changes.
+
+Rooms are discovered either by walking a directory tree (every directory that
+directly contains two or more images is one room) or from a JSON manifest of
+the form {"<room id>": ["path/to/1.jpg", "path/to/2.jpg", ...]}.
+
+Usage:
+    python batch_stitch.py --input-dir library/ --output-dir out/
+    python batch_stitch.py --manifest rooms.json --output-dir out/ --workers 4
+
+Completed rooms are appended to a checkpoint file as they finish, so an
+interrupted run can be restarted with the same arguments and will skip rooms
+that were already stitched successfully.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from stitcher import stitch_images
+from stitch_worker import check_worker, init_worker, opencv_threads_for
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff')
+DEFAULT_CHECKPOINT_NAME = 'batch_stitch_checkpoint.jsonl'
+DEFAULT_REPORT_NAME = 'batch_stitch_report.json'
+
+
+def discover_rooms(input_dir):
+    """
+    Walks a directory tree and collects every directory holding at least two images.
+
+    Args:
+        input_dir (str): Root directory of the image library.
+
+    Returns:
+        dict: Mapping of room id (directory path relative to input_dir) to a sorted list of image paths.
+    """
+    rooms = {}
+    for dirpath, _, filenames in os.walk(input_dir):
+        images = sorted(
+            os.path.join(dirpath, name) for name in filenames
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if len(images) >= 2:
+            room_id = os.path.relpath(dirpath, input_dir).replace(os.sep, '/')
+            rooms[room_id] = images
+    return rooms
+
+
+def load_manifest(manifest_path):
+    """
+    Loads room image sets from a JSON manifest.
+
+    Relative image paths are resolved against the manifest's own directory.
+
+    Args:
+        manifest_path (str): Path to a JSON file mapping room id to a list of image paths.
+
+    Returns:
+        dict: Mapping of room id to a list of image paths.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if not isinstance(manifest, dict):
+        raise ValueError("Manifest must be a JSON object mapping room ids to lists of image paths.")
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    rooms = {}
+    for room_id, paths in manifest.items():
+        if not isinstance(paths, list):
+            raise ValueError(f"Manifest entry for room '{room_id}' must be a list of image paths.")
+        rooms[room_id] = [p if os.path.isabs(p) else os.path.join(base_dir, p) for p in paths]
+    return rooms
+
+
+def load_checkpoint(checkpoint_path):
+    """
+    Reads the ids of rooms already stitched successfully by a previous run.
+
+    Args:
+        checkpoint_path (str): Path to the JSON-lines checkpoint file.
+
+    Returns:
+        dict: Mapping of room id to its checkpoint record, for successful rooms only.
+    """
+    completed = {}
+    if not os.path.exists(checkpoint_path):
+        return completed
+
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write can leave a truncated last line; ignore it.
+                continue
+            if record.get('success'):
+                completed[record['room_id']] = record
+    return completed
+
+
+def output_path_for(output_dir, room_id):
+    """
+    Returns the panorama path for a room, mirroring the room id as a relative path.
+
+    Raises:
+        ValueError: If the room id would place the panorama outside output_dir (e.g. "../x").
+    """
+    safe_id = room_id.strip('/').replace('/', os.sep) or 'root'
+    output_path = os.path.normpath(os.path.join(output_dir, safe_id + '_panorama.jpg'))
+    root = os.path.abspath(output_dir)
+    if os.path.commonpath([root, os.path.abspath(output_path)]) != root:
+        raise ValueError(f"Room id '{room_id}' would write outside the output directory.")
+    return output_path
+
+
+def _stitch_room(job):
+    """
+    Pool worker: stitches a single room and returns a result record.
+
+    Never raises, so one bad room cannot take down the whole batch.
+    """
+    room_id, image_paths, output_path = job
+    started = time.perf_counter()
+    record = {'room_id': room_id, 'output_path': output_path, 'image_count': len(image_paths)}
+    try:
+        check_worker()
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        success, stitched = stitch_images(image_paths, output_path)
+        record['success'] = bool(success)
+        if success:
+            record['width'] = int(stitched.shape[1])
+            record['height'] = int(stitched.shape[0])
+        else:
+            record['error'] = 'Stitching failed (see worker output for the stitcher status code).'
+    except Exception as e:
+        record['success'] = False
+        record['error'] = f"{type(e).__name__}: {e}"
+    record['seconds'] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_batch(rooms, output_dir, checkpoint_path, workers=None):
+    """
+    Stitches every room not already present in the checkpoint.
+
+    Args:
+        rooms (dict): Mapping of room id to a list of image paths.
+        output_dir (str): Directory panoramas are written to.
+        checkpoint_path (str): JSON-lines file recording finished rooms.
+        workers (int): Pool size; defaults to the number of CPUs.
+
+    Returns:
+        tuple: (list, list)
+            - Records produced during this run.
+            - Records of rooms skipped because the checkpoint already had them.
+    """
+    completed = load_checkpoint(checkpoint_path)
+    skipped = [completed[room_id] for room_id in rooms if room_id in completed]
+    jobs = []
+    rejected = []
+    for room_id, paths in sorted(rooms.items()):
+        if room_id in completed:
+            continue
+        try:
+            jobs.append((room_id, paths, output_path_for(output_dir, room_id)))
+        except ValueError as e:
+            # A bad room id fails that room only, recorded like any other stitch failure.
+            rejected.append({
+                'room_id': room_id, 'output_path': None, 'image_count': len(paths),
+                'success': False, 'error': f"{type(e).__name__}: {e}", 'seconds': 0.0,
+            })
+
+    print(f"🧵 {len(rooms)} rooms found, {len(skipped)} already done, {len(jobs)} to stitch.")
+    results = []
+    if not jobs and not rejected:
+        return results, skipped
+
+    total = len(jobs) + len(rejected)
+    with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+        def record_result(record):
+            results.append(record)
+            checkpoint.write(json.dumps(record) + '\n')
+            checkpoint.flush()
+            status = '✅' if record['success'] else '❌'
+            print(f"    {status} [{len(results)}/{total}] {record['room_id']} ({record['seconds']}s)")
+
+        for record in rejected:
+            record_result(record)
+        if jobs:
+            processes = workers or os.cpu_count() or 1
+            pool = Pool(processes=processes, initializer=init_worker, initargs=(opencv_threads_for(processes),))
+            with pool:
+                # Fail fast if the workers could not initialise instead of failing every room.
+                pool.apply(check_worker)
+                for record in pool.imap_unordered(_stitch_room, jobs):
+                    record_result(record)
+
+    return results, skipped
+
+
+def build_report(results, skipped, wall_seconds):
+    """Summarises a run into a JSON-serialisable report with per-room timings and failures."""
+    succeeded = [r for r in results if r['success']]
+    failed = [r for r in results if not r['success']]
+    timings = sorted(r['seconds'] for r in results)
+    return {
+        'total_rooms': len(results) + len(skipped),
+        'stitched': len(succeeded),
+        'failed': len(failed),
+        'skipped_from_checkpoint': len(skipped),
+        'wall_seconds': round(wall_seconds, 3),
+        'room_seconds_total': round(sum(timings), 3),
+        'room_seconds_max': timings[-1] if timings else 0,
+        'rooms': sorted(results, key=lambda r: r['room_id']),
+        'failures': [{'room_id': r['room_id'], 'error': r.get('error')} for r in failed],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch re-stitch room image sets into panoramas.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input-dir', help="Root of a directory tree of room image sets.")
+    source.add_argument('--manifest', help="JSON manifest mapping room ids to image paths.")
+    parser.add_argument('--output-dir', required=True, help="Directory to write panoramas to.")
+    parser.add_argument('--workers', type=int, default=None, help="Number of stitch processes (default: CPU count).")
+    parser.add_argument('--checkpoint', default=None, help=f"Checkpoint file (default: <output-dir>/{DEFAULT_CHECKPOINT_NAME}).")
+    parser.add_argument('--report', default=None, help=f"Summary report file (default: <output-dir>/{DEFAULT_REPORT_NAME}).")
+    parser.add_argument('--restart', action='store_true', help="Ignore and overwrite an existing checkpoint.")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    checkpoint_path = args.checkpoint or os.path.join(args.output_dir, DEFAULT_CHECKPOINT_NAME)
+    report_path = args.report or os.path.join(args.output_dir, DEFAULT_REPORT_NAME)
+
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    rooms = discover_rooms(args.input_dir) if args.input_dir else load_manifest(args.manifest)
+    if not rooms:
+        print("⚠️ No rooms with at least two images were found.")
+        return 1
+
+    started = time.perf_counter()
+    results, skipped = run_batch(rooms, args.output_dir, checkpoint_path, workers=args.workers)
+    report = build_report(results, skipped, time.perf_counter() - started)
+
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"--- Stitched {report['stitched']}, failed {report['failed']}, "
+          f"skipped {report['skipped_from_checkpoint']} in {report['wall_seconds']}s. Report: {report_path} ---")
+    for failure in report['failures']:
+        print(f"    ❌ {failure['room_id']}: {failure['error']}")
+
+    return 0 if report['failed'] == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
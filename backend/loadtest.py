@@ -0,0 +1,451 @@
+"""
+Load-test harness for app.py.
+
+Serves app.py the way production does (the Procfile's gunicorn command) in a
+child process on a local port, with the Supabase client swapped for
+local_supabase.LocalSupabase (seeded with synthetic tours and optional injected
+latency), then replays a weighted mix of /get-tour-data, /save-markers,
+/save-tooltips and /stitch requests over HTTP from concurrent clients and
+reports throughput and p50/p95/p99 latency per endpoint. The server runs in its
+own process so the client threads never compete with it for the GIL. Latency
+percentiles only cover 2xx responses; anything else (422 pre-flight
+rejections, 409 conflicts, 5xx, connection errors) is counted separately by
+status, next to the percentiles, so a fast failure is never reported as a fast
+request.
+
+Marker and tooltip saves are versioned change-sets (one added, one updated and,
+once the room is full, one removed item against the last revision seen), as the
+editor sends them; --legacy-saves replays the old full-list replacement instead.
+Concurrent clients editing the same room get 409s, which show up as errors.
+
+Usage:
+    python loadtest.py --concurrency 16 --duration 30
+    python loadtest.py --db-latency 0.03 --storage-latency 0.08 --mix get=80,markers=10,tooltips=10
+    python loadtest.py --mix get=60,markers=15,tooltips=15,stitch=10 --stitch-images "../frontend/test images/e1.jpg" "../frontend/test images/e2.jpg"
+    python loadtest.py --target http://127.0.0.1:5000 --tour-ids <id> ...   # hit an already running server instead
+"""
+import argparse
+import contextlib
+import glob
+import json
+import math
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import requests
+
+DEFAULT_MIX = 'get=70,markers=12,tooltips=12,stitch=6'
+ENDPOINTS = ('get', 'markers', 'tooltips', 'stitch')
+ENDPOINT_PATHS = {
+    'get': '/get-tour-data',
+    'markers': '/save-markers',
+    'tooltips': '/save-tooltips',
+    'stitch': '/stitch',
+}
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PROCFILE_PATH = os.path.join(BACKEND_DIR, 'Procfile')
+# The Procfile serves app:app; the load test serves the same app wired to a seeded LocalSupabase.
+LOCAL_APP_SPEC = 'loadtest:local_app()'
+BOOT_TIMEOUT_SECONDS = 60
+DEFAULT_STITCH_IMAGES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'test images', 'h*.jpg')))
+
+
+def parse_mix(text):
+    """Parses "get=70,markers=12,..." into a {endpoint: weight} dict."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}' in mix; expected one of {', '.join(ENDPOINTS)}.")
+        mix[name] = float(weight or 0)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("Traffic mix must have at least one non-zero weight.")
+    return mix
+
+
+def seed_tours(client, tours, rooms_per_tour, markers_per_room, tooltips_per_room):
+    """
+    Fills a LocalSupabase with synthetic tours shaped like real editor data.
+
+    Returns:
+        tuple: (dict, dict) - tour id -> list of room names, and
+            (tour id, room, "markers"/"tooltips") -> ids of the seeded items.
+    """
+    from app import (SUPABASE_MARKERS_TABLE, SUPABASE_PANORAMAS_TABLE, SUPABASE_TOOLTIPS_TABLE,
+                     SUPABASE_TOUR_AUDIO_TABLE, SUPABASE_TOURS_TABLE)
+
+    layout = {}
+    items = {}
+    for t in range(tours):
+        tour_id = str(uuid.uuid4())
+        rooms = [f"Room {r + 1}" for r in range(rooms_per_tour)]
+        layout[tour_id] = rooms
+        client.seed(SUPABASE_TOURS_TABLE, [{'tour_id': tour_id, 'tour_name': f"Load Test Tour {t + 1}", 'start_room': rooms[0]}])
+        client.seed(SUPABASE_PANORAMAS_TABLE, [
+            {'tour_id': tour_id, 'room_name': room, 'panorama_url': f"{client.public_url_base}/tour-images/{tour_id}/{room}.jpg"}
+            for room in rooms
+        ])
+        for room in rooms:
+            markers = [make_marker_row(tour_id, room, random.choice(rooms)) for _ in range(markers_per_room)]
+            tooltips = [make_tooltip_row(tour_id, room) for _ in range(tooltips_per_room)]
+            client.seed(SUPABASE_MARKERS_TABLE, markers)
+            client.seed(SUPABASE_TOOLTIPS_TABLE, tooltips)
+            items[(tour_id, room, 'markers')] = [row['marker_id'] for row in markers]
+            items[(tour_id, room, 'tooltips')] = [row['tooltip_id'] for row in tooltips]
+            client.seed(SUPABASE_TOUR_AUDIO_TABLE, [{'tour_id': tour_id, 'room_name': room, 'audio_url': f"{client.public_url_base}/tour-audio/{tour_id}/{room}.mp3"}])
+    return layout, items
+
+
+def make_marker_row(tour_id, room, to_room):
+    marker_id = str(uuid.uuid4())
+    return {'id': marker_id, 'marker_id': marker_id, 'tour_id': tour_id, 'from_room': room, 'to_room': to_room,
+            'position_x': random.uniform(-3.14, 3.14), 'position_y': random.uniform(-1.5, 1.5)}
+
+
+def make_tooltip_row(tour_id, room):
+    tooltip_id = str(uuid.uuid4())
+    return {'id': tooltip_id, 'tooltip_id': tooltip_id, 'tour_id': tour_id, 'room_name': room, 'content': 'Load test tooltip',
+            'position_x': random.uniform(-3.14, 3.14), 'position_y': random.uniform(-1.5, 1.5)}
+
+
+class Scenario:
+    """Builds one request for a given endpoint against the seeded tours."""
+
+    def __init__(self, base_url, layout, markers_per_room, tooltips_per_room, stitch_images, items=None, legacy_saves=False):
+        self.base_url = base_url.rstrip('/')
+        self.layout = layout
+        self.tour_ids = list(layout)
+        self.markers_per_room = markers_per_room
+        self.tooltips_per_room = tooltips_per_room
+        self.stitch_images = stitch_images
+        self.legacy_saves = legacy_saves
+        # Client-side view of each room, like an open editor: known item ids and the last revision seen.
+        self.items = items or {}
+        self.revisions = {}
+        self._state_lock = threading.Lock()
+
+    def _save_change_set(self, session, path, body, key, room_size, make_item):
+        """Sends one change-set against the last revision seen and updates the client-side view."""
+        with self._state_lock:
+            ids = self.items.setdefault(key, [])
+            changes = {
+                'added': [make_item(str(uuid.uuid4()))],
+                'updated': [make_item(random.choice(ids))] if ids else [],
+                'removed': [ids[0]] if len(ids) >= max(1, room_size) else [],
+            }
+            base_revision = self.revisions.get(key, 0)
+
+        response = session.post(f"{self.base_url}{path}", json=dict(body, baseRevision=base_revision, changes=changes), timeout=120)
+        if response.status_code in (200, 409):
+            payload = response.json()
+            with self._state_lock:
+                ids = self.items[key]
+                if response.status_code == 200:
+                    self.revisions[key] = payload['revision']
+                    ids.extend(item['id'] for item in changes['added'])
+                    for item_id in changes['removed']:
+                        if item_id in ids:
+                            ids.remove(item_id)
+                else:
+                    self.revisions[key] = payload.get('currentRevision', 0)
+        return response
+
+    def _pick_room(self):
+        tour_id = random.choice(self.tour_ids)
+        rooms = self.layout.get(tour_id) or ['Room 1']
+        return tour_id, random.choice(rooms), rooms
+
+    def send(self, session, endpoint):
+        tour_id, room, rooms = self._pick_room()
+        if endpoint == 'get':
+            return session.get(f"{self.base_url}/get-tour-data/{tour_id}", timeout=120)
+        if endpoint == 'markers' and not self.legacy_saves:
+            def make_marker(marker_id):
+                return {'id': marker_id, 'linkTo': random.choice(rooms),
+                        'position_x': random.uniform(-3.14, 3.14), 'position_y': random.uniform(-1.5, 1.5)}
+            return self._save_change_set(session, '/save-markers', {'tourId': tour_id, 'roomFrom': room},
+                                         (tour_id, room, 'markers'), self.markers_per_room, make_marker)
+        if endpoint == 'tooltips' and not self.legacy_saves:
+            def make_tooltip(tooltip_id):
+                return {'id': tooltip_id, 'content': 'Load test tooltip',
+                        'position_x': random.uniform(-3.14, 3.14), 'position_y': random.uniform(-1.5, 1.5)}
+            return self._save_change_set(session, '/save-tooltips', {'tourId': tour_id, 'roomName': room},
+                                         (tour_id, room, 'tooltips'), self.tooltips_per_room, make_tooltip)
+        if endpoint == 'markers':
+            markers = [{'id': str(uuid.uuid4()), 'linkTo': random.choice(rooms),
+                        'position_x': random.uniform(-3.14, 3.14), 'position_y': random.uniform(-1.5, 1.5)}
+                       for _ in range(self.markers_per_room)]
+            return session.post(f"{self.base_url}/save-markers", json={'tourId': tour_id, 'roomFrom': room, 'markers': markers}, timeout=120)
+        if endpoint == 'tooltips':
+            tooltips = [{'id': str(uuid.uuid4()), 'content': 'Load test tooltip',
+                         'position_x': random.uniform(-3.14, 3.14), 'position_y': random.uniform(-1.5, 1.5)}
+                        for _ in range(self.tooltips_per_room)]
+            return session.post(f"{self.base_url}/save-tooltips", json={'tourId': tour_id, 'roomName': room, 'tooltips': tooltips}, timeout=120)
+        if endpoint == 'stitch':
+            with contextlib.ExitStack() as stack:
+                files = [(f"{room}[]", (os.path.basename(p), stack.enter_context(open(p, 'rb')), 'image/jpeg')) for p in self.stitch_images]
+                return session.post(f"{self.base_url}/stitch", data={'tourId': tour_id}, files=files, timeout=600)
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+def run_load(scenario, mix, concurrency, duration, max_requests):
+    """
+    Runs `concurrency` client threads until `duration` seconds pass or `max_requests` are sent.
+
+    Returns:
+        tuple: (list, float) - samples as (endpoint, seconds, status code or None for a
+            connection error) and the wall-clock duration.
+    """
+    names = [name for name in ENDPOINTS if mix.get(name)]
+    weights = [mix[name] for name in names]
+    samples = []
+    samples_lock = threading.Lock()
+    sent = [0]
+    deadline = time.perf_counter() + duration
+
+    def client():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            with samples_lock:
+                if max_requests and sent[0] >= max_requests:
+                    return
+                sent[0] += 1
+            endpoint = random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = scenario.send(session, endpoint).status_code
+            except requests.RequestException:
+                status = None
+            elapsed = time.perf_counter() - started
+            with samples_lock:
+                samples.append((endpoint, elapsed, status))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def is_success(status):
+    return status is not None and 200 <= status < 300
+
+
+def build_report(samples, wall_seconds):
+    """
+    Aggregates samples into per-endpoint throughput, error counts and latency percentiles (milliseconds).
+
+    Throughput and percentiles are computed over successful (2xx) responses only; the
+    rest are counted under 'errors' and broken down by status in 'error_statuses'.
+    """
+    report = {'wall_seconds': round(wall_seconds, 3), 'total_requests': len(samples),
+              'throughput_rps': round(sum(1 for s in samples if is_success(s[2])) / wall_seconds, 2) if wall_seconds else 0,
+              'endpoints': {}}
+
+    def ms(seconds):
+        return round(seconds * 1000, 1) if seconds is not None else None
+
+    for name in ENDPOINTS:
+        endpoint_samples = [s for s in samples if s[0] == name]
+        if not endpoint_samples:
+            continue
+        latencies = sorted(s[1] for s in endpoint_samples if is_success(s[2]))
+        error_statuses = {}
+        for _, _, status in endpoint_samples:
+            if not is_success(status):
+                key = str(status) if status is not None else 'connection_error'
+                error_statuses[key] = error_statuses.get(key, 0) + 1
+        report['endpoints'][ENDPOINT_PATHS[name]] = {
+            'requests': len(endpoint_samples),
+            'errors': len(endpoint_samples) - len(latencies),
+            'error_statuses': error_statuses,
+            'throughput_rps': round(len(latencies) / wall_seconds, 2) if wall_seconds else 0,
+            'p50_ms': ms(percentile(latencies, 50)),
+            'p95_ms': ms(percentile(latencies, 95)),
+            'p99_ms': ms(percentile(latencies, 99)),
+            'max_ms': ms(latencies[-1] if latencies else None),
+        }
+    return report
+
+
+def print_report(report):
+    print(f"\n--- Load test: {report['total_requests']} requests in {report['wall_seconds']}s ({report['throughput_rps']} successful req/s) ---")
+    print(f"{'endpoint':<16}{'reqs':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'non-2xx':>9}")
+    for path, stats in report['endpoints'].items():
+        print(f"{path:<16}{stats['requests']:>8}{stats['throughput_rps']:>9}"
+              f"{str(stats['p50_ms']):>10}{str(stats['p95_ms']):>10}{str(stats['p99_ms']):>10}{str(stats['max_ms']):>10}"
+              f"{stats['errors']:>9}")
+    for path, stats in report['endpoints'].items():
+        if stats['error_statuses']:
+            breakdown = ', '.join(f"{status}: {count}" for status, count in sorted(stats['error_statuses'].items()))
+            print(f"    ⚠️ {path} non-2xx responses (excluded from latency): {breakdown}")
+
+
+def local_app():
+    """
+    Gunicorn entry point (LOCAL_APP_SPEC): app.py against a LocalSupabase holding the
+    tables and latency settings that boot_local_app wrote to LOADTEST_STATE_PATH.
+    """
+    import app as app_module
+    from local_supabase import LocalSupabase
+
+    with open(os.environ['LOADTEST_STATE_PATH'], 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    client = LocalSupabase(db_latency=state['db_latency'], storage_latency=state['storage_latency'], jitter=state['jitter'])
+    for table, rows in state['tables'].items():
+        client.seed(table, rows)
+    app_module.supabase = client
+    return app_module.app
+
+
+def gunicorn_command(port):
+    """The Procfile's web command, serving LOCAL_APP_SPEC on 127.0.0.1:port with this interpreter."""
+    with open(PROCFILE_PATH, 'r', encoding='utf-8') as f:
+        web = next(line.split(':', 1)[1] for line in f if line.startswith('web:'))
+    argv = shlex.split(web)
+    if argv[0] != 'gunicorn' or 'app:app' not in argv:
+        raise ValueError(f"Expected 'web: gunicorn ... app:app' in {PROCFILE_PATH}, got: {web.strip()}")
+    argv = [LOCAL_APP_SPEC if arg == 'app:app' else arg for arg in argv[1:]]
+    return [sys.executable, '-m', 'gunicorn', '--bind', f"127.0.0.1:{port}", '--log-level', 'warning'] + argv
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_serving(base_url, server):
+    """Polls until the server answers HTTP (any status) or fails if it exits or times out."""
+    deadline = time.perf_counter() + BOOT_TIMEOUT_SECONDS
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {server.returncode} before serving requests (rerun with --show-app-logs to see why).")
+        try:
+            requests.get(f"{base_url}/", timeout=5)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"gunicorn did not start serving {base_url} within {BOOT_TIMEOUT_SECONDS}s.")
+
+
+def boot_local_app(args):
+    """
+    Seeds synthetic tours and serves app.py under gunicorn in a child process.
+
+    Returns:
+        tuple: (base_url, layout, items, server) where server is the gunicorn Popen;
+            pass it to stop_local_app when done.
+    """
+    from local_supabase import LocalSupabase
+
+    port = args.port or free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    command = gunicorn_command(port)
+
+    client = LocalSupabase()
+    layout, items = seed_tours(client, args.tours, args.rooms, args.markers, args.tooltips)
+    state_file = tempfile.NamedTemporaryFile('w', suffix='.json', prefix='loadtest_state_', delete=False, encoding='utf-8')
+    with state_file:
+        json.dump({'tables': client.tables, 'db_latency': args.db_latency,
+                   'storage_latency': args.storage_latency, 'jitter': args.jitter}, state_file)
+
+    # The app prints (and logs tracebacks) on every request; keep that out of the report unless asked for.
+    app_output = None if args.show_app_logs else subprocess.DEVNULL
+    server = subprocess.Popen(
+        command, cwd=BACKEND_DIR,
+        env=dict(os.environ, LOADTEST_STATE_PATH=state_file.name, PYTHONUNBUFFERED='1'),
+        stdout=app_output, stderr=app_output,
+    )
+    server.state_path = state_file.name
+    try:
+        wait_until_serving(base_url, server)
+    except Exception:
+        stop_local_app(server)
+        raise
+    print(f"🦄 gunicorn (pid {server.pid}) serving the seeded app at {base_url}")
+    return base_url, layout, items, server
+
+
+def stop_local_app(server):
+    server.terminate()
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+    os.remove(server.state_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the virtual tour backend.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads.")
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds to run for.")
+    parser.add_argument('--requests', type=int, default=0, help="Stop after this many requests (0 = duration only).")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Weighted traffic mix (default: {DEFAULT_MIX}).")
+    parser.add_argument('--db-latency', type=float, default=0.0, help="Injected seconds per table request.")
+    parser.add_argument('--storage-latency', type=float, default=0.0, help="Injected seconds per storage request.")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra uniform random latency (seconds) on every call.")
+    parser.add_argument('--tours', type=int, default=20, help="Synthetic tours to seed.")
+    parser.add_argument('--rooms', type=int, default=6, help="Rooms per tour.")
+    parser.add_argument('--markers', type=int, default=4, help="Markers per room (seeded and per save).")
+    parser.add_argument('--tooltips', type=int, default=3, help="Tooltips per room (seeded and per save).")
+    parser.add_argument('--legacy-saves', action='store_true', help="Save markers/tooltips as full lists instead of change-sets.")
+    parser.add_argument('--stitch-images', nargs='+', default=DEFAULT_STITCH_IMAGES, help="Images uploaded by each /stitch request.")
+    parser.add_argument('--port', type=int, default=0, help="Port for the local gunicorn server (0 = any free port).")
+    parser.add_argument('--target', help="Base URL of an already running server; skips the local boot.")
+    parser.add_argument('--tour-ids', nargs='+', default=[], help="Existing tour ids to use with --target.")
+    parser.add_argument('--report', help="Also write the report as JSON to this path.")
+    parser.add_argument('--show-app-logs', action='store_true', help="Show the app's and gunicorn's output.")
+    args = parser.parse_args(argv)
+
+    if args.mix.get('stitch') and len(args.stitch_images) < 2:
+        print("⚠️ /stitch needs at least 2 --stitch-images; dropping it from the mix.")
+        args.mix['stitch'] = 0
+
+    server = None
+    if args.target:
+        if not args.tour_ids:
+            parser.error("--target requires --tour-ids")
+        base_url, layout, items = args.target, {tour_id: [] for tour_id in args.tour_ids}, {}
+    else:
+        base_url, layout, items, server = boot_local_app(args)
+
+    scenario = Scenario(base_url, layout, args.markers, args.tooltips, args.stitch_images, items=items, legacy_saves=args.legacy_saves)
+    print(f"🚀 Load testing {base_url} with {args.concurrency} clients for up to {args.duration}s, mix {args.mix}")
+
+    try:
+        samples, wall_seconds = run_load(scenario, args.mix, args.concurrency, args.duration, args.requests)
+    finally:
+        if server is not None:
+            stop_local_app(server)
+
+    report = build_report(samples, wall_seconds)
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""
+In-memory stand-in for the parts of the Supabase client that app.py uses.
+
+Implements the table query builder (select/insert/upsert/update/delete with
+eq/in_/order/limit/single) and the storage bucket API (upload/get_public_url/
+remove/copy) on plain Python dicts, with optional injected latency per call so
+load tests can model a remote database without touching the real project.
+Unique keys declared in sql/ (see UNIQUE_KEYS) are enforced like Postgres
+does, so code that relies on them (e.g. the revision-0 insert in
+advance_room_revision) behaves the same here.
+
+    from local_supabase import LocalSupabase
+    import app
+    app.supabase = LocalSupabase(db_latency=0.02, storage_latency=0.05)
+"""
+import copy
+import random
+import threading
+import time
+
+# Unique constraints from sql/*.sql, per table name.
+UNIQUE_KEYS = {
+    'room_revisions': [('tour_id', 'room_name', 'kind')],
+}
+
+
+class LocalSupabaseError(Exception):
+    """Raised for requests the real API would reject (e.g. .single() on zero rows)."""
+
+
+class LocalUniqueViolation(LocalSupabaseError):
+    """Raised when a write would duplicate a unique key; carries Postgres' error code like postgrest's APIError."""
+
+    code = '23505'
+
+
+class LocalResponse:
+    """Mimics postgrest's APIResponse: `data`, `count` and `error` attributes."""
+
+    def __init__(self, data, count=None, error=None):
+        self.data = data
+        self.count = count
+        self.error = error
+
+    def __repr__(self):
+        return f"LocalResponse(data={self.data!r}, count={self.count!r})"
+
+
+class LocalUploadResponse:
+    """Mimics storage3's UploadResponse, which app.py checks for a `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self.full_path = path
+
+    def __repr__(self):
+        return f"LocalUploadResponse(path={self.path!r})"
+
+
+class _Latency:
+    """Sleeps for a base latency plus uniform jitter."""
+
+    def __init__(self, seconds=0.0, jitter=0.0):
+        self.seconds = seconds
+        self.jitter = jitter
+
+    def wait(self):
+        delay = self.seconds + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class LocalQuery:
+    """A single table request; built fluently and run by execute()."""
+
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._action = 'select'
+        self._columns = None
+        self._payload = None
+        self._on_conflict = None
+        self._filters = []
+        self._order = None
+        self._limit = None
+        self._single = False
+
+    # --- actions ---
+    def select(self, columns='*', count=None):
+        self._action = 'select'
+        self._columns = None if columns.strip() == '*' else [c.strip() for c in columns.split(',')]
+        return self
+
+    def insert(self, payload):
+        self._action, self._payload = 'insert', payload
+        return self
+
+    def upsert(self, payload, on_conflict=None, **_):
+        self._action, self._payload = 'upsert', payload
+        self._on_conflict = [c.strip() for c in on_conflict.split(',')] if on_conflict else None
+        return self
+
+    def update(self, payload):
+        self._action, self._payload = 'update', payload
+        return self
+
+    def delete(self):
+        self._action = 'delete'
+        return self
+
+    # --- filters / modifiers ---
+    def eq(self, column, value):
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self._filters.append(lambda row: row.get(column) != value)
+        return self
+
+    def in_(self, column, values):
+        values = list(values)
+        self._filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def _matches(self, row):
+        return all(f(row) for f in self._filters)
+
+    def _project(self, row):
+        if self._columns is None:
+            return copy.deepcopy(row)
+        return {c: copy.deepcopy(row.get(c)) for c in self._columns}
+
+    def execute(self):
+        self._client.db_latency.wait()
+        with self._client.lock:
+            rows = self._client.tables.setdefault(self._table, [])
+            return getattr(self, '_run_' + self._action)(rows)
+
+    def _run_select(self, rows):
+        result = [row for row in rows if self._matches(row)]
+        if self._order:
+            column, desc = self._order
+            result.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        if self._limit is not None:
+            result = result[:self._limit]
+        result = [self._project(r) for r in result]
+        if self._single:
+            if len(result) != 1:
+                raise LocalSupabaseError(f"JSON object requested, multiple (or no) rows returned ({len(result)})")
+            return LocalResponse(result[0], count=None)
+        return LocalResponse(result)
+
+    def _check_unique(self, rows, written):
+        """Raises LocalUniqueViolation if `written` rows (new or changed) clash with each other or with `rows`."""
+        for columns in self._client.unique_keys.get(self._table, []):
+            seen = {}
+            for row in rows + written:
+                key = tuple(row.get(c) for c in columns)
+                if None in key:
+                    continue  # NULLs never conflict in Postgres.
+                if key in seen and seen[key] is not row:
+                    raise LocalUniqueViolation(
+                        f'duplicate key value violates unique constraint "{self._table}_{"_".join(columns)}_key"')
+                seen[key] = row
+
+    def _run_insert(self, rows):
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        inserted = [copy.deepcopy(item) for item in payload]
+        self._check_unique(rows, inserted)
+        rows.extend(inserted)
+        return LocalResponse(copy.deepcopy(inserted))
+
+    def _run_upsert(self, rows):
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        keys = self._on_conflict or ['id']
+        # Work on copies so a violation leaves the table untouched, as the failed statement would.
+        result = [dict(row) for row in rows]
+        written = []
+        for item in payload:
+            existing = next((r for r in result if all(r.get(k) == item.get(k) for k in keys)), None)
+            if existing is not None:
+                existing.update(copy.deepcopy(item))
+            else:
+                existing = copy.deepcopy(item)
+                result.append(existing)
+            written.append(existing)
+        self._check_unique(result, [])
+        rows[:] = result
+        return LocalResponse(copy.deepcopy(written))
+
+    def _run_update(self, rows):
+        result = [dict(row, **copy.deepcopy(self._payload)) if self._matches(row) else row for row in rows]
+        self._check_unique(result, [])
+        updated = [copy.deepcopy(new) for old, new in zip(rows, result) if new is not old]
+        rows[:] = result
+        return LocalResponse(updated)
+
+    def _run_delete(self, rows):
+        deleted = [row for row in rows if self._matches(row)]
+        rows[:] = [row for row in rows if not self._matches(row)]
+        return LocalResponse(deleted)
+
+
+class LocalBucket:
+    """A storage bucket held in memory as {path: (bytes, content_type)}."""
+
+    def __init__(self, client, name):
+        self._client = client
+        self._name = name
+
+    def _objects(self):
+        return self._client.buckets.setdefault(self._name, {})
+
+    def upload(self, path, file, file_options=None):
+        self._client.storage_latency.wait()
+        content_type = (file_options or {}).get('content-type', 'application/octet-stream')
+        with self._client.lock:
+            self._objects()[path] = (bytes(file), content_type)
+        return LocalUploadResponse(path)
+
+    def get_public_url(self, path):
+        return f"{self._client.public_url_base}/{self._name}/{path}"
+
+    def download(self, path):
+        self._client.storage_latency.wait()
+        with self._client.lock:
+            if path not in self._objects():
+                raise LocalSupabaseError(f"Object not found: {path}")
+            return self._objects()[path][0]
+
+    def remove(self, paths):
+        self._client.storage_latency.wait()
+        removed = []
+        with self._client.lock:
+            for path in paths:
+                if self._objects().pop(path, None) is not None:
+                    removed.append({'name': path})
+        return removed
+
+    def copy(self, from_path, to_path):
+        self._client.storage_latency.wait()
+        with self._client.lock:
+            if from_path not in self._objects():
+                raise LocalSupabaseError(f"Object not found: {from_path}")
+            self._objects()[to_path] = self._objects()[from_path]
+        return {'path': to_path}
+
+
+class LocalStorage:
+    def __init__(self, client):
+        self._client = client
+
+    def from_(self, bucket):
+        return LocalBucket(self._client, bucket)
+
+
+class LocalSupabase:
+    """
+    Drop-in replacement for the `supabase` client object used in app.py.
+
+    Args:
+        db_latency (float): Seconds added to every table request.
+        storage_latency (float): Seconds added to every storage request (except get_public_url).
+        jitter (float): Extra uniform random delay (0..jitter seconds) added to both.
+        unique_keys (dict): Table name -> list of unique column tuples; defaults to UNIQUE_KEYS.
+    """
+
+    def __init__(self, db_latency=0.0, storage_latency=0.0, jitter=0.0, public_url_base='http://local-supabase/storage/v1/object/public',
+                 unique_keys=None):
+        self.lock = threading.RLock()
+        self.tables = {}
+        self.unique_keys = UNIQUE_KEYS if unique_keys is None else unique_keys
+        self.buckets = {}
+        self.db_latency = _Latency(db_latency, jitter)
+        self.storage_latency = _Latency(storage_latency, jitter)
+        self.public_url_base = public_url_base
+        self.storage = LocalStorage(self)
+
+    def table(self, name):
+        return LocalQuery(self, name)
+
+    from_ = table
+
+    def seed(self, table, rows):
+        """Bulk-loads rows without any injected latency."""
+        with self.lock:
+            self.tables.setdefault(table, []).extend(copy.deepcopy(rows))
@@ -0,0 +1,286 @@
+"""
+Capture-quality triage for a room's image set, run before stitching.
+
+Works on downscaled frames so a whole set is checked in milliseconds:
+  - blur: variance of the Laplacian (low variance = few sharp edges)
+  - exposure: mean brightness and the share of clipped highlight/shadow pixels
+  - overlap: ORB matches + RANSAC homography between each frame and the frames up
+    to NEIGHBOUR_SPAN either side of it in capture order, turned into the fraction
+    of one frame that lands inside the other; only frames left without a good
+    neighbour are matched further afield, so a set costs O(n) pairs, not O(n^2)
+
+Every image and pair gets diagnostics; issues are either "error" (the stitch
+cannot reasonably succeed, the set is rejected) or "warning" (flagged only).
+Overlap problems are only ever warnings: ORB on a thumbnail finds far fewer
+matches than the stitcher does at full resolution, so a set it cannot match
+(e.g. test images w1-w3) may still stitch fine.
+"""
+import time
+
+import cv2
+import numpy as np
+
+THUMBNAIL_MAX_SIDE = 480
+
+# Laplacian variance on the thumbnail (always exactly THUMBNAIL_MAX_SIDE on its longest side);
+# below ERROR the frame is motion-blurred/out of focus.
+BLUR_ERROR_THRESHOLD = 20.0
+BLUR_WARNING_THRESHOLD = 60.0
+
+CLIP_HIGH_LEVEL = 250
+CLIP_LOW_LEVEL = 5
+CLIPPED_ERROR_FRACTION = 0.40
+CLIPPED_WARNING_FRACTION = 0.15
+
+MIN_INLIERS = 12
+OVERLAP_WARNING_FRACTION = 0.15
+
+ORB_FEATURES = 500
+
+# Each frame is matched against this many frames either side of it in capture order (wrapping
+# round, as a 360° set ends where it started). Frames without a good overlap among those are
+# then matched against the rest of the set, nearest first, while the set has spent fewer than
+# MAX_PAIRS_PER_IMAGE pair checks per image.
+NEIGHBOUR_SPAN = 2
+MAX_PAIRS_PER_IMAGE = 6
+
+
+class PreflightError(Exception):
+    """Raised when an image set fails pre-flight checks; carries the full diagnostics report."""
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+
+def load_thumbnail(path, max_side=THUMBNAIL_MAX_SIDE):
+    """
+    Decodes an image at reduced resolution and resizes it so its longest side is exactly max_side.
+
+    The fixed size keeps blur scores comparable between large and small sources; the
+    Laplacian variance of the same scene changes with the resolution it is measured at.
+
+    Args:
+        path (str): Path to the image.
+        max_side (int): Width/height of the longest side of the returned thumbnail.
+
+    Returns:
+        numpy.ndarray: BGR thumbnail, or None if the file cannot be decoded.
+    """
+    # Let libjpeg do most of the downscaling during decode, which is far cheaper than a full decode + resize,
+    # but never decode below max_side: that would have to be upscaled again.
+    image = cv2.imread(path, cv2.IMREAD_REDUCED_COLOR_4)
+    if image is not None and max(image.shape[:2]) < max_side:
+        image = cv2.imread(path, cv2.IMREAD_REDUCED_COLOR_2 if max(image.shape[:2]) * 2 >= max_side else cv2.IMREAD_COLOR)
+    if image is None:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+
+    height, width = image.shape[:2]
+    scale = max_side / float(max(height, width))
+    if scale != 1.0:
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+    return image
+
+
+def blur_score(gray):
+    """Returns the variance of the Laplacian; higher means sharper."""
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def exposure_stats(gray):
+    """
+    Summarises the brightness histogram of a grayscale image.
+
+    Returns:
+        dict: mean brightness plus the fraction of clipped highlight and shadow pixels.
+    """
+    hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+    total = hist.sum() or 1.0
+    return {
+        'mean_brightness': round(float(np.dot(hist, np.arange(256)) / total), 1),
+        'clipped_highlights': round(float(hist[CLIP_HIGH_LEVEL:].sum() / total), 3),
+        'clipped_shadows': round(float(hist[:CLIP_LOW_LEVEL + 1].sum() / total), 3),
+    }
+
+
+def match_homography(features_a, features_b, matcher):
+    """
+    Matches ORB features of frame B against frame A and fits a RANSAC homography B -> A.
+
+    Args:
+        features_a, features_b (tuple): (keypoints, descriptors) from ORB.
+        matcher (cv2.BFMatcher): Hamming matcher.
+
+    Returns:
+        tuple: (numpy.ndarray or None, int, int) - the homography (None if there is no
+            reliable fit), the number of ratio-test matches and the number of RANSAC inliers.
+    """
+    kp_a, des_a = features_a
+    kp_b, des_b = features_b
+    if des_a is None or des_b is None or len(kp_a) < 2 or len(kp_b) < 2:
+        return None, 0, 0
+
+    good = []
+    for pair in matcher.knnMatch(des_b, des_a, k=2):
+        if len(pair) == 2 and pair[0].distance < 0.75 * pair[1].distance:
+            good.append(pair[0])
+    if len(good) < MIN_INLIERS:
+        return None, len(good), 0
+
+    src = np.float32([kp_b[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
+    dst = np.float32([kp_a[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
+    homography, mask = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+    if homography is None:
+        return None, len(good), 0
+    inliers = int(mask.sum())
+    if inliers < MIN_INLIERS:
+        return None, len(good), inliers
+    return homography, len(good), inliers
+
+
+def estimate_overlap(features_a, features_b, shape_a, shape_b, matcher):
+    """
+    Estimates how much of frame B overlaps frame A.
+
+    Args:
+        features_a, features_b (tuple): (keypoints, descriptors) from ORB.
+        shape_a, shape_b (tuple): Thumbnail shapes.
+        matcher (cv2.BFMatcher): Hamming matcher.
+
+    Returns:
+        dict: good match count, RANSAC inlier count, overlap fraction (0..1) and the
+            homography B -> A in unit-square coordinates (a nested list, so it is independent
+            of the thumbnail size and JSON-serialisable), or None if there is no reliable fit.
+    """
+    homography, matches, inliers = match_homography(features_a, features_b, matcher)
+    result = {'matches': matches, 'inliers': inliers, 'overlap': 0.0, 'homography': None}
+    if homography is None:
+        return result
+
+    h_b, w_b = shape_b[:2]
+    h_a, w_a = shape_a[:2]
+
+    # Project B's frame into A and measure the intersection with A's frame. A projection that is
+    # not convex comes from a degenerate fit, which is no more reliable than having none.
+    corners_b = np.float32([[0, 0], [w_b, 0], [w_b, h_b], [0, h_b]]).reshape(-1, 1, 2)
+    projected = cv2.perspectiveTransform(corners_b, homography).reshape(-1, 2)
+    if not cv2.isContourConvex(projected.astype(np.float32)):
+        return result
+
+    unit = np.diag([1.0 / w_a, 1.0 / h_a, 1.0]) @ homography @ np.diag([float(w_b), float(h_b), 1.0])
+    result['homography'] = (unit / unit[2, 2]).round(8).tolist()
+    frame_a = np.float32([[0, 0], [w_a, 0], [w_a, h_a], [0, h_a]])
+    area, _ = cv2.intersectConvexConvex(frame_a, projected.astype(np.float32))
+    result['overlap'] = round(float(max(0.0, area) / (w_a * h_a)), 3)
+    return result
+
+
+def _issue(severity, code, message):
+    return {'severity': severity, 'code': code, 'message': message}
+
+
+def preflight_image_set(image_paths):
+    """
+    Checks an image set for blur, bad exposure and insufficient overlap.
+
+    Args:
+        image_paths (list): Paths to the images of one room, in capture order.
+
+    Returns:
+        dict: Report with 'ok' (False if any error-level issue was found), per-image
+            diagnostics under 'images', every pair that was matched under 'pairs' (reused by
+            the stitcher's exposure normalisation) and 'seconds'.
+    """
+    started = time.perf_counter()
+    orb = cv2.ORB_create(nfeatures=ORB_FEATURES)
+    images = []
+    thumbnails = []
+
+    for index, path in enumerate(image_paths):
+        entry = {'index': index, 'path': path, 'issues': []}
+        thumb = load_thumbnail(path)
+        thumbnails.append(thumb)
+        images.append(entry)
+        if thumb is None:
+            entry['issues'].append(_issue('error', 'unreadable', "Image could not be decoded."))
+            continue
+
+        gray = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+        entry['blur_score'] = round(blur_score(gray), 1)
+        entry.update(exposure_stats(gray))
+        entry['_features'] = orb.detectAndCompute(gray, None)
+
+        if entry['blur_score'] < BLUR_ERROR_THRESHOLD:
+            entry['issues'].append(_issue('error', 'blurry', f"Image is too blurry (sharpness {entry['blur_score']}); retake it holding the camera steady."))
+        elif entry['blur_score'] < BLUR_WARNING_THRESHOLD:
+            entry['issues'].append(_issue('warning', 'soft', f"Image is slightly soft (sharpness {entry['blur_score']})."))
+
+        for key, label, advice in (('clipped_highlights', 'overexposed', 'lower the exposure'),
+                                   ('clipped_shadows', 'underexposed', 'add light or raise the exposure')):
+            fraction = entry[key]
+            if fraction >= CLIPPED_ERROR_FRACTION:
+                entry['issues'].append(_issue('error', label, f"{int(fraction * 100)}% of the image is clipped; {advice}."))
+            elif fraction >= CLIPPED_WARNING_FRACTION:
+                entry['issues'].append(_issue('warning', label, f"{int(fraction * 100)}% of the image is clipped."))
+
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    pair_cache = {}
+
+    def check_pair(i, j):
+        key = (min(i, j), max(i, j))
+        if key not in pair_cache:
+            a, b = images[key[0]], images[key[1]]
+            overlap = estimate_overlap(a['_features'], b['_features'], thumbnails[key[0]].shape, thumbnails[key[1]].shape, matcher)
+            pair_cache[key] = dict(overlap, a=key[0], b=key[1])
+        return pair_cache[key]
+
+    usable = [e['index'] for e in images if '_features' in e]
+    count = len(usable)
+    if count >= 2:
+        span = max(1, min(NEIGHBOUR_SPAN, count // 2))
+        budget = MAX_PAIRS_PER_IMAGE * count
+        for position, i in enumerate(usable):
+            neighbours = {usable[(position + step) % count] for d in range(1, span + 1) for step in (d, -d)} - {i}
+            best = max(check_pair(i, j)['overlap'] for j in neighbours)
+            if best < OVERLAP_WARNING_FRACTION:
+                # Uploads are not always in capture order: look for a better match further away.
+                for j in sorted(usable, key=lambda j: abs(j - i)):
+                    if best >= OVERLAP_WARNING_FRACTION:
+                        break
+                    if j != i and ((min(i, j), max(i, j)) in pair_cache or len(pair_cache) < budget):
+                        best = max(best, check_pair(i, j)['overlap'])
+            images[i]['best_overlap'] = best
+            if best == 0.0:
+                images[i]['issues'].append(_issue('warning', 'no_overlap', "No overlap with any other image could be measured; shoot with about 30% overlap between frames."))
+            elif best < OVERLAP_WARNING_FRACTION:
+                images[i]['issues'].append(_issue('warning', 'low_overlap', f"Image overlaps its best neighbour by only {int(best * 100)}%."))
+
+    for entry in images:
+        entry.pop('_features', None)
+
+    errors = [dict(issue, index=e['index']) for e in images for issue in e['issues'] if issue['severity'] == 'error']
+    if len(image_paths) < 2:
+        errors.append(_issue('error', 'too_few_images', "At least 2 images are needed to stitch a panorama."))
+
+    return {
+        'ok': not errors,
+        'errors': errors,
+        'images': images,
+        'pairs': [pair_cache[key] for key in sorted(pair_cache)],
+        'seconds': round(time.perf_counter() - started, 4),
+    }
+
+
+def summarise_report(report):
+    """Returns a one-line, human readable summary of a failed pre-flight report."""
+    if report['ok']:
+        return "Pre-flight checks passed."
+    details = "; ".join(
+        f"image {e['index'] + 1}: {e['message']}" if 'index' in e else e['message']
+        for e in report['errors'][:5]
+    )
+    more = f" (+{len(report['errors']) - 5} more)" if len(report['errors']) > 5 else ""
+    return f"Image set rejected before stitching: {details}{more}"
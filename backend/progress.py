@@ -0,0 +1,107 @@
+"""
+Lightweight in-process pub/sub for stitch progress events.
+
+The stitch pipeline publishes one event per stage (received, decoded, ...,
+uploaded) on a channel named after the tour id; the /stitch-progress SSE
+endpoint subscribes to that channel and forwards the events to the browser.
+
+Channels keep a short replay buffer so a client that connects just after
+starting the upload still sees the early stages. Everything lives in the
+memory of a single process: run the app with one worker process and several
+threads (see Procfile) so the SSE stream and the stitch share a broker.
+"""
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+REPLAY_EVENTS = 200
+# Channels with no subscribers and no activity for this long are forgotten.
+CHANNEL_TTL_SECONDS = 15 * 60
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+# Events that end a tour's stream.
+TERMINAL_STAGES = ('done', 'failed')
+
+
+class ProgressBroker:
+    """Fans out progress events to any number of subscriber queues per channel."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}   # channel -> set of queues
+        self._history = {}       # channel -> deque of recent events
+        self._touched = {}       # channel -> last publish time
+        self._ids = itertools.count(1)
+
+    def publish(self, channel, event):
+        """Stamps an event with an id and time, stores it for replay and hands it to every subscriber."""
+        event = dict(event, id=next(self._ids), ts=round(time.time(), 3))
+        with self._lock:
+            self._expire_locked()
+            self._history.setdefault(channel, deque(maxlen=REPLAY_EVENTS)).append(event)
+            self._touched[channel] = time.monotonic()
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                pass  # A stalled client must never block the stitch pipeline.
+        return event
+
+    def subscribe(self, channel, replay=True):
+        """
+        Registers a subscriber on a channel.
+
+        Returns:
+            tuple: (queue.Queue, list) - the queue new events arrive on, and past events to replay.
+        """
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+            history = list(self._history.get(channel, ())) if replay else []
+        return subscriber, history
+
+    def unsubscribe(self, channel, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def _expire_locked(self):
+        now = time.monotonic()
+        for channel, touched in list(self._touched.items()):
+            if now - touched > CHANNEL_TTL_SECONDS and channel not in self._subscribers:
+                self._history.pop(channel, None)
+                del self._touched[channel]
+
+
+class StageTimer:
+    """
+    Publishes stage events for one room and measures how long each stage took.
+
+    Call it with a stage name when that stage finishes: timer('decoded'). Pass
+    seconds= to report a duration measured elsewhere (e.g. in a worker process).
+    """
+
+    def __init__(self, broker, channel, room):
+        self._broker = broker
+        self._channel = channel
+        self._room = room
+        self._started = time.perf_counter()
+        self._last = self._started
+
+    def __call__(self, stage, seconds=None, **extra):
+        now = time.perf_counter()
+        if seconds is None:
+            seconds = now - self._last
+        self._last = now
+        event = {'room': self._room, 'stage': stage, 'seconds': round(seconds, 4), 'elapsed': round(now - self._started, 4)}
+        event.update(extra)
+        return self._broker.publish(self._channel, event)
+
+
+broker = ProgressBroker()
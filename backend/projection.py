@@ -0,0 +1,341 @@
+"""
+Panorama projection conversions: equirectangular <-> cubemap <-> cylindrical.
+
+Every conversion is a single cv2.remap whose coordinate tables depend only on
+the conversion, the source/destination sizes and its parameters. The tables
+are built once, converted to OpenCV's fixed-point format (CV_16SC2 + CV_16UC1,
+6 instead of 8 bytes per pixel and a faster remap), and kept in a bounded LRU.
+When a cache directory is configured they are also written to disk as .npy
+files and memory-mapped on later loads, so other processes (and restarts)
+skip the trigonometry too.
+
+Cubemaps are handled as a horizontal strip of six square faces in FACE_ORDER,
+so one remap produces (or consumes) all faces at once.
+
+Equirectangular and cylindrical sources wrap in longitude but not in
+latitude, so they are padded with WRAP_PAD columns from the opposite edge
+before the remap (the tables already point into the padded image); rows are
+clamped at an equirectangular source's poles and fall off to black past a
+cylinder's top and bottom.
+
+This is a library module: nothing in the upload pipeline calls it yet.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+FACE_ORDER = ('right', 'left', 'up', 'down', 'front', 'back')
+
+# Bump when the map math changes so stale on-disk tables are not reused.
+MAP_VERSION = 3
+DEFAULT_CACHE_ENTRIES = int(os.environ.get('PROJECTION_CACHE_ENTRIES', '16'))
+DEFAULT_CACHE_DIR = os.environ.get('PROJECTION_CACHE_DIR') or None
+DEFAULT_VFOV_DEGREES = 120.0
+# Columns copied from the opposite edge of a 360-degree source; bilinear sampling needs one.
+WRAP_PAD = 2
+
+
+# --- Coordinate helpers (all float32, vectorised over the whole output grid) ---
+def _pixel_grid(width, height):
+    xs = (np.arange(width, dtype=np.float32) + 0.5)
+    ys = (np.arange(height, dtype=np.float32) + 0.5)
+    return np.meshgrid(xs, ys)
+
+
+def _directions_to_equirect(x, y, z, src_width, src_height):
+    """Maps unit direction vectors to source pixel coordinates in an equirectangular image."""
+    lon = np.arctan2(x, z)
+    lat = np.arctan2(y, np.sqrt(x * x + z * z))
+    map_x = (lon + np.pi) / (2 * np.pi) * src_width - 0.5
+    map_y = (np.pi / 2 - lat) / np.pi * src_height - 0.5
+    return map_x.astype(np.float32), map_y.astype(np.float32)
+
+
+def _equirect_directions(width, height):
+    """Unit direction vector for every pixel centre of an equirectangular image."""
+    px, py = _pixel_grid(width, height)
+    lon = px / width * 2 * np.pi - np.pi
+    lat = np.pi / 2 - py / height * np.pi
+    cos_lat = np.cos(lat)
+    return cos_lat * np.sin(lon), np.sin(lat), cos_lat * np.cos(lon), lon, lat
+
+
+def _face_directions(face, a, b):
+    """Direction vectors for face coordinates a (right) and b (down), both in [-1, 1]."""
+    one = np.ones_like(a)
+    return {
+        'front': (a, -b, one),
+        'back': (-a, -b, -one),
+        'right': (one, -b, -a),
+        'left': (-one, -b, a),
+        'up': (a, one, b),
+        'down': (a, -one, -b),
+    }[face]
+
+
+# --- Map builders: each returns float32 (map_x, map_y) of the destination's shape ---
+def _build_equirect_to_cubemap(src_size, dst_size):
+    src_width, src_height = src_size
+    face_size = dst_size[1]
+    px, py = _pixel_grid(face_size, face_size)
+    a = px / face_size * 2 - 1
+    b = py / face_size * 2 - 1
+    map_x = np.empty((face_size, face_size * 6), np.float32)
+    map_y = np.empty_like(map_x)
+    for index, face in enumerate(FACE_ORDER):
+        x, y, z = _face_directions(face, a, b)
+        norm = np.sqrt(x * x + y * y + z * z)
+        fx, fy = _directions_to_equirect(x / norm, y / norm, z / norm, src_width, src_height)
+        map_x[:, index * face_size:(index + 1) * face_size] = fx + WRAP_PAD
+        map_y[:, index * face_size:(index + 1) * face_size] = fy
+    return map_x, map_y
+
+
+def _build_cubemap_to_equirect(src_size, dst_size):
+    face_size = src_size[1]
+    x, y, z, _, _ = _equirect_directions(*dst_size)
+    ax, ay, az = np.abs(x), np.abs(y), np.abs(z)
+
+    # Pick the face along the dominant axis and invert _face_directions for it.
+    conditions = [
+        (ax >= ay) & (ax >= az) & (x > 0),
+        (ax >= ay) & (ax >= az) & (x <= 0),
+        (ay > ax) & (ay >= az) & (y > 0),
+        (ay > ax) & (ay >= az) & (y <= 0),
+        (az > ax) & (az > ay) & (z > 0),
+        (az > ax) & (az > ay) & (z <= 0),
+    ]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Only the entry of the face each pixel falls on is used, so divisions by ~0 elsewhere are harmless.
+        face_a = [-z / ax, z / ax, x / ay, x / ay, x / az, -x / az]
+        face_b = [-y / ax, -y / ax, z / ay, -z / ay, -y / az, -y / az]
+        a = np.select(conditions, face_a)
+        b = np.select(conditions, face_b)
+    index = np.select(conditions, [np.float32(i) for i in range(6)])
+
+    map_x = index * face_size + (a + 1) / 2 * face_size - 0.5
+    map_y = (b + 1) / 2 * face_size - 0.5
+    # Keep samples inside their own face so bilinear filtering does not bleed into the neighbour in the strip.
+    map_x = np.clip(map_x, index * face_size, (index + 1) * face_size - 1)
+    map_y = np.clip(map_y, 0, face_size - 1)
+    return map_x.astype(np.float32), map_y.astype(np.float32)
+
+
+def _build_equirect_to_cylindrical(src_size, dst_size, vfov_degrees):
+    src_width, src_height = src_size
+    width, height = dst_size
+    px, py = _pixel_grid(width, height)
+    half_extent = np.tan(np.radians(vfov_degrees) / 2)
+    lon = px / width * 2 * np.pi - np.pi
+    lat = np.arctan((1 - 2 * py / height) * half_extent)
+    cos_lat = np.cos(lat)
+    map_x, map_y = _directions_to_equirect(cos_lat * np.sin(lon), np.sin(lat), cos_lat * np.cos(lon), src_width, src_height)
+    return map_x + WRAP_PAD, map_y
+
+
+def _build_cylindrical_to_equirect(src_size, dst_size, vfov_degrees):
+    src_width, src_height = src_size
+    _, _, _, lon, lat = _equirect_directions(*dst_size)
+    half_extent = np.tan(np.radians(vfov_degrees) / 2)
+    with np.errstate(invalid='ignore'):
+        h = np.tan(lat) / half_extent
+    map_x = (lon + np.pi) / (2 * np.pi) * src_width - 0.5 + WRAP_PAD
+    # Clamp inside the cylinder so its top and bottom rows do not blend into the black beyond them;
+    # latitudes outside its vertical field of view have no source pixel at all.
+    map_y = np.clip((1 - h) / 2 * src_height - 0.5, 0, src_height - 1)
+    map_y[~(np.abs(h) <= 1)] = -1
+    return map_x.astype(np.float32), map_y.astype(np.float32)
+
+
+_BUILDERS = {
+    'equirect_to_cubemap': _build_equirect_to_cubemap,
+    'cubemap_to_equirect': _build_cubemap_to_equirect,
+    'equirect_to_cylindrical': _build_equirect_to_cylindrical,
+    'cylindrical_to_equirect': _build_cylindrical_to_equirect,
+}
+
+
+class RemapCache:
+    """
+    Bounded LRU of fixed-point remap tables, optionally backed by memory-mapped .npy files.
+
+    Args:
+        max_entries (int): Tables kept in memory; the least recently used is dropped first.
+        cache_dir (str): Directory for on-disk tables, or None to keep them in memory only.
+    """
+
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES, cache_dir=DEFAULT_CACHE_DIR):
+        self.max_entries = max(1, int(max_entries))
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.disk_loads = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, conversion, src_size, dst_size, **params):
+        """
+        Returns (map1, map2) for cv2.remap, building or loading them on a miss.
+
+        Args:
+            conversion (str): One of the keys of _BUILDERS, e.g. "equirect_to_cubemap".
+            src_size (tuple): (width, height) of the source image.
+            dst_size (tuple): (width, height) of the output image.
+            **params: Extra conversion parameters (e.g. vfov_degrees).
+        """
+        key = (conversion, tuple(src_size), tuple(dst_size), tuple(sorted(params.items())))
+        with self._lock:
+            maps = self._entries.get(key)
+            if maps is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return maps
+            self.misses += 1
+
+        # Build outside the lock; two threads racing on the same key just do the work twice.
+        maps = self._load(key) if self.cache_dir else None
+        if maps is None:
+            map_x, map_y = _BUILDERS[conversion](tuple(src_size), tuple(dst_size), **params)
+            maps = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+            if self.cache_dir:
+                maps = self._store(key, maps)
+
+        with self._lock:
+            self._entries[key] = maps
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return maps
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses, 'disk_loads': self.disk_loads}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _paths(self, key):
+        digest = hashlib.sha1(repr((MAP_VERSION,) + key).encode('utf-8')).hexdigest()[:20]
+        base = os.path.join(self.cache_dir, f"{key[0]}_{digest}")
+        return base + '_map1.npy', base + '_map2.npy'
+
+    def _load(self, key):
+        path1, path2 = self._paths(key)
+        if not (os.path.exists(path1) and os.path.exists(path2)):
+            return None
+        try:
+            maps = (np.load(path1, mmap_mode='r'), np.load(path2, mmap_mode='r'))
+        except (OSError, ValueError):
+            return None
+        self.disk_loads += 1
+        return maps
+
+    def _store(self, key, maps):
+        """Writes tables atomically (temp file + rename) and returns memory-mapped views of them."""
+        for array, path in zip(maps, self._paths(key)):
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.npy.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        return self._load(key) or maps
+
+
+remap_cache = RemapCache()
+
+
+def _remap(image, maps, border_mode=cv2.BORDER_CONSTANT):
+    map1, map2 = maps
+    return cv2.remap(image, map1, map2, interpolation=cv2.INTER_LINEAR, borderMode=border_mode)
+
+
+def _remap_wrapped(image, maps, border_mode=cv2.BORDER_REPLICATE):
+    """Remaps a 360-degree source with tables built for it padded by WRAP_PAD columns on each side."""
+    # Only longitude wraps: BORDER_WRAP in cv2.remap would also blend the top row into the bottom one.
+    padded = cv2.copyMakeBorder(image, 0, 0, WRAP_PAD, WRAP_PAD, cv2.BORDER_WRAP)
+    return _remap(padded, maps, border_mode=border_mode)
+
+
+def equirect_to_cubemap(image, face_size=None, cache=None):
+    """
+    Converts an equirectangular panorama into six cube faces.
+
+    Args:
+        image (numpy.ndarray): Equirectangular image (width = 2 x height for a full sphere).
+        face_size (int): Edge length of each face; defaults to a quarter of the image width.
+        cache (RemapCache): Table cache to use; defaults to the module-wide cache.
+
+    Returns:
+        dict: Face name (see FACE_ORDER) -> numpy.ndarray of shape (face_size, face_size, channels).
+    """
+    height, width = image.shape[:2]
+    face_size = int(face_size or width // 4)
+    maps = (cache or remap_cache).get('equirect_to_cubemap', (width, height), (face_size * 6, face_size))
+    strip = _remap_wrapped(image, maps)
+    return {face: strip[:, i * face_size:(i + 1) * face_size] for i, face in enumerate(FACE_ORDER)}
+
+
+def cubemap_to_equirect(faces, width, height=None, cache=None):
+    """
+    Converts six cube faces back into an equirectangular panorama.
+
+    Args:
+        faces (dict or numpy.ndarray): Face name -> square image, or a pre-built strip in FACE_ORDER.
+        width (int): Output width.
+        height (int): Output height; defaults to width // 2.
+        cache (RemapCache): Table cache to use; defaults to the module-wide cache.
+
+    Returns:
+        numpy.ndarray: The equirectangular image.
+    """
+    strip = faces if isinstance(faces, np.ndarray) else np.hstack([faces[face] for face in FACE_ORDER])
+    face_size = strip.shape[0]
+    height = int(height or width // 2)
+    maps = (cache or remap_cache).get('cubemap_to_equirect', (face_size * 6, face_size), (int(width), height))
+    return _remap(strip, maps, border_mode=cv2.BORDER_REPLICATE)
+
+
+def equirect_to_cylindrical(image, width=None, height=None, vfov_degrees=DEFAULT_VFOV_DEGREES, cache=None):
+    """
+    Converts an equirectangular panorama to a 360-degree cylindrical projection.
+
+    Args:
+        image (numpy.ndarray): Equirectangular image.
+        width (int), height (int): Output size; defaults to the input size.
+        vfov_degrees (float): Vertical field of view kept by the cylinder (must be < 180).
+        cache (RemapCache): Table cache to use; defaults to the module-wide cache.
+
+    Returns:
+        numpy.ndarray: The cylindrical image.
+    """
+    src_height, src_width = image.shape[:2]
+    dst_size = (int(width or src_width), int(height or src_height))
+    maps = (cache or remap_cache).get('equirect_to_cylindrical', (src_width, src_height), dst_size, vfov_degrees=float(vfov_degrees))
+    return _remap_wrapped(image, maps)
+
+
+def cylindrical_to_equirect(image, width=None, height=None, vfov_degrees=DEFAULT_VFOV_DEGREES, cache=None):
+    """
+    Converts a 360-degree cylindrical panorama to equirectangular; latitudes outside
+    the cylinder's vertical field of view are left black.
+
+    Args:
+        image (numpy.ndarray): Cylindrical image.
+        width (int), height (int): Output size; defaults to (input width, input width // 2).
+        vfov_degrees (float): Vertical field of view covered by the cylinder (must be < 180).
+        cache (RemapCache): Table cache to use; defaults to the module-wide cache.
+
+    Returns:
+        numpy.ndarray: The equirectangular image.
+    """
+    src_height, src_width = image.shape[:2]
+    width = int(width or src_width)
+    dst_size = (width, int(height or width // 2))
+    maps = (cache or remap_cache).get('cylindrical_to_equirect', (src_width, src_height), dst_size, vfov_degrees=float(vfov_degrees))
+    return _remap_wrapped(image, maps, border_mode=cv2.BORDER_CONSTANT)
@@ -0,0 +1,114 @@
+-- Keyset-paginated tour listing with aggregated counts, used by GET /tours.
+-- One call returns a page of tours newest first; pass the last row's
+-- (created_at, tour_id) as (after_created_at, after_tour_id) for the next page.
+-- Each correlated subquery is an index lookup on tour_id, so a page costs one
+-- round-trip no matter how many tours exist. The keyset compares and orders
+-- on tour_id's own type (uuid) so tour_created_at_tour_id_idx serves the sort.
+--
+-- last_modified is tour.updated_at, kept current by triggers: any write to the
+-- tour row itself (name, start room) or to its panoramas, markers, tooltips or
+-- narration touches it, whether it comes from the backend or the frontend.
+-- thumbnail_url is the small copy the backend uploads next to each panorama
+-- (panoramas.thumbnail_url); rooms stitched before it existed fall back to
+-- their full panorama.
+-- Apply after sql/room_revisions.sql, which the one-off backfill reads.
+
+alter table panoramas add column if not exists thumbnail_url text;
+
+create index if not exists panoramas_tour_id_idx on panoramas (tour_id);
+create index if not exists markers_tour_id_idx on markers (tour_id);
+create index if not exists tooltips_tour_id_idx on tooltips (tour_id);
+create index if not exists tour_created_at_tour_id_idx on tour (created_at desc, tour_id desc);
+
+alter table tour add column if not exists updated_at timestamptz;
+update tour t
+   set updated_at = greatest(t.created_at, (select max(r.updated_at) from room_revisions r where r.tour_id = t.tour_id))
+ where t.updated_at is null;
+alter table tour alter column updated_at set default now();
+alter table tour alter column updated_at set not null;
+
+create or replace function touch_tour_row()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+-- now() is fixed for the transaction, so a batch of child rows touches the tour once.
+create or replace function touch_parent_tour()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op = 'DELETE' then
+    update tour set updated_at = now() where tour_id = old.tour_id and updated_at <> now();
+  else
+    update tour set updated_at = now() where tour_id = new.tour_id and updated_at <> now();
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists tour_touch on tour;
+create trigger tour_touch before update on tour
+  for each row execute function touch_tour_row();
+
+drop trigger if exists panoramas_touch_tour on panoramas;
+create trigger panoramas_touch_tour after insert or update or delete on panoramas
+  for each row execute function touch_parent_tour();
+
+drop trigger if exists markers_touch_tour on markers;
+create trigger markers_touch_tour after insert or update or delete on markers
+  for each row execute function touch_parent_tour();
+
+drop trigger if exists tooltips_touch_tour on tooltips;
+create trigger tooltips_touch_tour after insert or update or delete on tooltips
+  for each row execute function touch_parent_tour();
+
+drop trigger if exists tour_audio_touch_tour on tour_audio;
+create trigger tour_audio_touch_tour after insert or update or delete on tour_audio
+  for each row execute function touch_parent_tour();
+
+-- The signature changed (after_tour_id is no longer text), so drop the old overload.
+drop function if exists list_tours(int, timestamptz, text);
+
+create or replace function list_tours(
+  page_size int,
+  after_created_at timestamptz default null,
+  after_tour_id uuid default null
+)
+returns table (
+  tour_id uuid,
+  tour_name text,
+  start_room text,
+  created_at timestamptz,
+  room_count bigint,
+  marker_count bigint,
+  tooltip_count bigint,
+  thumbnail_url text,
+  last_modified timestamptz
+)
+language sql stable
+as $$
+  select
+    t.tour_id,
+    t.tour_name,
+    t.start_room,
+    t.created_at,
+    (select count(*) from panoramas p where p.tour_id = t.tour_id),
+    (select count(*) from markers m where m.tour_id = t.tour_id),
+    (select count(*) from tooltips tt where tt.tour_id = t.tour_id),
+    coalesce(
+      (select coalesce(p.thumbnail_url, p.panorama_url) from panoramas p where p.tour_id = t.tour_id and p.room_name = t.start_room limit 1),
+      (select coalesce(p.thumbnail_url, p.panorama_url) from panoramas p where p.tour_id = t.tour_id order by p.room_name limit 1)
+    ),
+    t.updated_at
+  from tour t
+  where after_created_at is null
+     or (t.created_at, t.tour_id) < (after_created_at, after_tour_id)
+  order by t.created_at desc, t.tour_id desc
+  limit page_size;
+$$;
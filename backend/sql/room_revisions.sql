@@ -0,0 +1,16 @@
+-- Per-room revision counters for markers and tooltips, used by the versioned
+-- change-sets of /save-markers and /save-tooltips (baseRevision / 409 on stale).
+-- One row per (tour, room, kind); kind is 'markers' or 'tooltips'. A missing
+-- row means revision 0. Apply before sql/list_tours.sql, whose backfill of
+-- tour.updated_at reads updated_at.
+--
+-- tour_id must have the same type as tour.tour_id (uuid here).
+
+create table if not exists room_revisions (
+  tour_id uuid not null references tour (tour_id) on delete cascade,
+  room_name text not null,
+  kind text not null check (kind in ('markers', 'tooltips')),
+  revision integer not null default 0,
+  updated_at timestamptz not null default now(),
+  unique (tour_id, room_name, kind)
+);
@@ -0,0 +1,6 @@
+-- Narration metadata computed once by /upload-audio (see audio.py) and returned
+-- by /get-tour-data. Apply before deploying the backend that selects these
+-- columns; rows uploaded earlier keep nulls until their audio is re-uploaded.
+
+alter table tour_audio add column if not exists duration_seconds double precision;
+alter table tour_audio add column if not exists waveform_peaks jsonb;
@@ -0,0 +1,245 @@
+"""
+Long-lived stitch worker processes.
+
+Each worker imports OpenCV once, sizes OpenCV's thread pool to its share of the
+machine, builds its cv2.Stitcher up front and runs a tiny warm-up pass, so real
+requests only pay for the stitch itself. Per-call timings are tagged as the
+first stitch in that process or a warm one; measure_cold_start() times the
+path without a pool (new process, imports, first stitch) for comparison.
+Stage events are streamed back to the caller through a manager queue while the
+stitch runs, so progress reporting works the same as for inline stitching.
+
+Run directly to compare the three on an image set:
+    python stitch_worker.py --workers 2 --repeat 5 image1.jpg image2.jpg ...
+"""
+import argparse
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from multiprocessing import get_context
+
+import cv2
+import numpy as np
+
+from stitcher import configure_opencv, get_stitcher, stitch_images
+
+# Per-process state, set by init_worker() in every pool process.
+_worker_state = {'warm': False, 'ready_seconds': None, 'init_error': None}
+
+# How often the caller checks for the stitch result while waiting on stage events.
+STAGE_POLL_SECONDS = 0.1
+
+
+def opencv_threads_for(processes):
+    """Splits the available cores evenly between `processes` stitch workers (at least one thread each)."""
+    return max(1, (os.cpu_count() or 1) // max(1, processes))
+
+
+def init_worker(opencv_threads, warm_up=True):
+    """
+    Pool initializer: configures OpenCV and pre-builds the stitcher for this process.
+
+    Never raises: an exception escaping a Pool initializer kills the worker and
+    multiprocessing respawns it forever while pending tasks wait. Failures are kept
+    in _worker_state instead and surfaced by check_worker().
+
+    Args:
+        opencv_threads (int): Value passed to cv2.setNumThreads in this process.
+        warm_up (bool): Build the stitcher and run the warm-up pass; False leaves the
+            process cold, as measure_cold_start() needs.
+    """
+    started = time.perf_counter()
+    try:
+        configure_opencv(opencv_threads)
+        if warm_up:
+            stitcher = get_stitcher()
+
+            # Touch the feature finder / matcher code paths once on a synthetic image so
+            # lazily initialised OpenCV internals are ready before the first real request.
+            # The result is irrelevant; two identical textures are expected to fail.
+            rng = np.random.default_rng(0)
+            texture = rng.integers(0, 255, size=(120, 160, 3), dtype=np.uint8)
+            try:
+                stitcher.estimateTransform([texture, texture.copy()])
+            except cv2.error:
+                pass
+    except Exception as e:
+        _worker_state['init_error'] = f"{type(e).__name__}: {e}"
+        print(f"❌ Stitch worker {os.getpid()} failed to initialise: {_worker_state['init_error']}")
+
+    _worker_state['ready_seconds'] = round(time.perf_counter() - started, 4)
+    _worker_state['warm'] = False
+
+
+def check_worker():
+    """Pool task: raises if this worker's initializer failed, otherwise returns its state."""
+    if _worker_state['init_error']:
+        raise Exception(f"Stitch worker failed to initialise: {_worker_state['init_error']}")
+    return dict(_worker_state, pid=os.getpid())
+
+
+def _run_stitch(image_paths, output_path, pairs=None, events=None):
+    """
+    Pool task: stitches one image set and reports how long it took, per stage, and whether the worker was warm.
+    Each finished stage is also put on `events` (a manager queue) as (stage, seconds) when one is given.
+    """
+    check_worker()
+    was_warm = _worker_state['warm']
+    started = time.perf_counter()
+    stages = []
+    last = [started]
+
+    def record_stage(stage):
+        now = time.perf_counter()
+        stages.append((stage, now - last[0]))
+        if events is not None:
+            events.put(stages[-1])
+        last[0] = now
+
+    success, stitched = stitch_images(image_paths, output_path, on_stage=record_stage, pairs=pairs)
+    timing = {
+        'pid': os.getpid(),
+        'first': not was_warm,
+        'seconds': round(time.perf_counter() - started, 4),
+        'worker_ready_seconds': _worker_state['ready_seconds'],
+        'stages': stages,
+    }
+    _worker_state['warm'] = True
+    return success, stitched, timing
+
+
+class StitchWorkerPool:
+    """
+    A fixed pool of warm stitch processes.
+
+    Args:
+        processes (int): Number of worker processes.
+        opencv_threads (int): Threads OpenCV may use inside each worker. Defaults to an even
+            split of the machine's cores so the pool does not oversubscribe the CPU.
+    """
+
+    def __init__(self, processes=1, opencv_threads=None):
+        self.processes = max(1, int(processes))
+        self.opencv_threads = opencv_threads if opencv_threads is not None else opencv_threads_for(self.processes)
+        self._lock = threading.Lock()
+        self._timings = []
+        self._cold_starts = []
+        started = time.perf_counter()
+        # "spawn" keeps the workers independent of whatever state the parent (e.g. Flask/Supabase clients) holds.
+        context = get_context('spawn')
+        self._pool = context.Pool(
+            processes=self.processes,
+            initializer=init_worker,
+            initargs=(self.opencv_threads,),
+        )
+        try:
+            # Every worker runs the same initializer, so one health check tells whether they all came up.
+            self._pool.apply(check_worker)
+        except Exception:
+            self._pool.terminate()
+            raise
+        # Hosts the per-stitch stage event queues; plain multiprocessing queues cannot be passed to pool tasks.
+        self._manager = context.Manager()
+        self.startup_seconds = round(time.perf_counter() - started, 4)
+        print(f"✅ Stitch worker pool started: {self.processes} processes x {self.opencv_threads} OpenCV threads.")
+
+    def stitch(self, image_paths, output_path, on_stage=None, pairs=None):
+        """
+        Stitches an image set in one of the warm workers.
+
+        Args:
+            on_stage (callable): Optional callback receiving (stage, seconds=...) as each stage
+                finishes in the worker; called from the calling thread while the stitch runs.
+            pairs (list): Optional preflight pairs, passed on to stitch_images.
+
+        Returns:
+            tuple: (bool, numpy.ndarray) exactly like stitcher.stitch_images.
+        """
+        events = self._manager.Queue() if on_stage is not None else None
+        pending = self._pool.apply_async(_run_stitch, (image_paths, output_path, pairs, events))
+        if events is not None:
+            # Every event is queued before the task returns, so draining once more after it is ready gets them all.
+            while True:
+                done = pending.ready()
+                try:
+                    while True:
+                        stage, seconds = events.get(timeout=0 if done else STAGE_POLL_SECONDS)
+                        on_stage(stage, seconds=seconds)
+                except queue.Empty:
+                    pass
+                if done:
+                    break
+        success, stitched, timing = pending.get()
+        with self._lock:
+            self._timings.append(timing)
+        return success, stitched
+
+    def measure_cold_start(self, image_paths, output_path):
+        """
+        Stitches an image set in a brand-new process without any warm-up and records the
+        wall time, including process start and imports: what a request pays without the pool.
+
+        Returns:
+            float: Seconds from starting the process to having the result.
+        """
+        started = time.perf_counter()
+        with get_context('spawn').Pool(processes=1, initializer=init_worker, initargs=(self.opencv_threads, False)) as pool:
+            pool.apply(_run_stitch, (image_paths, output_path))
+        seconds = round(time.perf_counter() - started, 4)
+        with self._lock:
+            self._cold_starts.append({'seconds': seconds})
+        return seconds
+
+    def latency_report(self):
+        """Summarises cold-start, first and warm stitch latency observed so far."""
+        with self._lock:
+            timings = list(self._timings)
+            cold_starts = list(self._cold_starts)
+
+        def summarise(samples):
+            seconds = sorted(t['seconds'] for t in samples)
+            if not seconds:
+                return {'count': 0, 'mean_seconds': None, 'median_seconds': None}
+            return {
+                'count': len(seconds),
+                'mean_seconds': round(sum(seconds) / len(seconds), 4),
+                'median_seconds': seconds[len(seconds) // 2],
+            }
+
+        return {
+            'processes': self.processes,
+            'opencv_threads_per_process': self.opencv_threads,
+            'pool_startup_seconds': self.startup_seconds,
+            'cold_start': summarise(cold_starts),
+            'first': summarise([t for t in timings if t['first']]),
+            'warm': summarise([t for t in timings if not t['first']]),
+        }
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+        self._manager.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold-start, first and warm stitch latency of the worker pool.")
+    parser.add_argument('images', nargs='+', help="Images of one room, in capture order.")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes in the pool.")
+    parser.add_argument('--repeat', type=int, default=5, help="Stitches per measurement.")
+    args = parser.parse_args()
+
+    pool = StitchWorkerPool(processes=args.workers)
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_path = os.path.join(output_dir, 'panorama.jpg')
+        for _ in range(args.repeat):
+            pool.measure_cold_start(args.images, output_path)
+            pool.stitch(args.images, output_path)
+    pool.close()
+    print(json.dumps(pool.latency_report(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
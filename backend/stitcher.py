@@ -1,32 +1,314 @@
+import math
+import threading
+
 import cv2
 import numpy as np
 
-def stitch_images(image_paths, output_path):
+from preflight import ORB_FEATURES, match_homography
+
+# Longest side of the thumbnails used to estimate exposure gains.
+NORMALIZE_THUMBNAIL_MAX_SIDE = 320
+# Same noise/gain priors OpenCV's GainCompensator uses.
+GAIN_SIGMA_N = 10.0
+GAIN_SIGMA_G = 0.1
+GAIN_LIMITS = (0.5, 2.0)
+# Images whose gains are all this close to 1 are left as they are.
+GAIN_TOLERANCE = 0.01
+
+# What Stitcher_create(PANORAMA) composes with; _compose_panorama uses the same pieces.
+COMPOSE_WARPER = 'spherical'
+COMPOSE_BLEND_BANDS = 5
+
+# Stitcher objects are reused per thread: building one allocates the feature
+# finder, matcher and blender, and a cv2.Stitcher is not safe to share across threads.
+_stitcher_cache = threading.local()
+
+
+def configure_opencv(num_threads):
+    """
+    Sets OpenCV's internal thread pool size for the current process.
+
+    When several stitch processes run side by side each one should get a share of
+    the cores rather than OpenCV's default of one thread per core, which
+    oversubscribes the CPU.
+
+    Args:
+        num_threads (int): Threads OpenCV may use; 0 disables its threading entirely.
+    """
+    cv2.setNumThreads(int(num_threads))
+
+
+def get_stitcher():
+    """
+    Returns this thread's cv2.Stitcher, creating it on first use.
+
+    Returns:
+        cv2.Stitcher: A panorama-mode stitcher that can be reused across calls.
+    """
+    stitcher = getattr(_stitcher_cache, 'stitcher', None)
+    if stitcher is None:
+        stitcher = _stitcher_cache.stitcher = cv2.Stitcher_create(cv2.Stitcher_PANORAMA)
+    return stitcher
+
+
+def _unit_scale(shape):
+    """Matrix taking unit-square coordinates to pixel coordinates of an image of this shape."""
+    return np.diag([float(shape[1]), float(shape[0]), 1.0])
+
+
+def _pair_homographies(thumbs, pairs):
+    """
+    Yields (i, j, homography j -> i in thumbnail pixels) for every overlapping pair.
+
+    With pairs from preflight_image_set (unit-square homographies, already matched)
+    nothing is matched again; otherwise the thumbnails are matched here.
+    """
+    if pairs is not None:
+        for pair in pairs:
+            i, j, homography = pair['a'], pair['b'], pair.get('homography')
+            if homography is None or i >= len(thumbs) or j >= len(thumbs):
+                continue
+            scaled = _unit_scale(thumbs[i].shape) @ np.asarray(homography, dtype=np.float64) @ np.linalg.inv(_unit_scale(thumbs[j].shape))
+            yield i, j, scaled
+        return
+
+    orb = cv2.ORB_create(nfeatures=ORB_FEATURES)
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    features = [orb.detectAndCompute(cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY), None) for thumb in thumbs]
+    for i in range(len(thumbs)):
+        for j in range(i + 1, len(thumbs)):
+            homography, _, _ = match_homography(features[i], features[j], matcher)
+            if homography is not None:
+                yield i, j, homography
+
+
+def estimate_exposure_gains(images, pairs=None):
+    """
+    Estimates a per-image, per-channel gain that equalises brightness and white balance.
+
+    The gains minimise the colour difference inside every overlap (weighted by its
+    area) while staying close to 1, the same objective as OpenCV's GainCompensator,
+    solved for all three channels in one batched linear solve.
+
+    Args:
+        images (list): BGR images (numpy.ndarray, uint8).
+        pairs (list): Optional 'pairs' from preflight_image_set, indexed like `images`; their
+            homographies are reused instead of matching ORB features on thumbnails again.
+
+    Returns:
+        tuple: (numpy.ndarray, int) - gains of shape (len(images), 3) in B, G, R order, and
+            the number of overlaps they were measured on (0 means every gain is just 1).
+    """
+    n = len(images)
+    if pairs is not None and not any(pair.get('homography') is not None for pair in pairs):
+        return np.ones((n, 3)), 0  # Nothing to measure; skip building thumbnails.
+    thumbs = []
+    for image in images:
+        height, width = image.shape[:2]
+        scale = min(1.0, NORMALIZE_THUMBNAIL_MAX_SIDE / float(max(height, width)))
+        # Decimating by an integer step first makes INTER_AREA several times cheaper on full-size frames;
+        # the thumbnail only feeds mean colours of whole overlaps.
+        step = max(1, int(1.0 / (2 * scale)))
+        thumbs.append(cv2.resize(image[::step, ::step], (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA))
+
+    # A[c] and b[c] are the normal equations for channel c.
+    inv_n = 1.0 / GAIN_SIGMA_N ** 2
+    inv_g = 1.0 / GAIN_SIGMA_G ** 2
+    A = np.zeros((3, n, n))
+    b = np.zeros((3, n))
+    measured = 0
+
+    for i, j, homography in _pair_homographies(thumbs, pairs):
+        h_i, w_i = thumbs[i].shape[:2]
+        h_j, w_j = thumbs[j].shape[:2]
+        # Footprint of j inside i, and of i inside j.
+        mask_i = cv2.warpPerspective(np.full((h_j, w_j), 255, np.uint8), homography, (w_i, h_i), flags=cv2.INTER_NEAREST)
+        mask_j = cv2.warpPerspective(np.full((h_i, w_i), 255, np.uint8), np.linalg.inv(homography), (w_j, h_j), flags=cv2.INTER_NEAREST)
+        count = min(cv2.countNonZero(mask_i), cv2.countNonZero(mask_j))
+        if count == 0:
+            continue
+        mean_ij = np.array(cv2.mean(thumbs[i], mask=mask_i)[:3])
+        mean_ji = np.array(cv2.mean(thumbs[j], mask=mask_j)[:3])
+
+        A[:, i, i] += count * (mean_ij ** 2 * inv_n + inv_g)
+        A[:, j, j] += count * (mean_ji ** 2 * inv_n + inv_g)
+        A[:, i, j] -= count * mean_ij * mean_ji * inv_n
+        A[:, j, i] -= count * mean_ij * mean_ji * inv_n
+        b[:, i] += count * inv_g
+        b[:, j] += count * inv_g
+        measured += 1
+
+    # Images without any overlap would make the system singular; a unit prior pins them to gain 1.
+    A[:, np.arange(n), np.arange(n)] += inv_g
+    b += inv_g
+
+    gains = np.linalg.solve(A, b[..., None])[..., 0]
+    return np.clip(gains.T, *GAIN_LIMITS), measured
+
+
+def normalize_exposure(images, pairs=None):
+    """
+    Equalises exposure and white balance across an image set, modifying the images in place.
+
+    Unlike the stitcher's block gain compensator, which applies one gain to all channels
+    alike, this also corrects a white balance shift between frames. Once it has run, the
+    panorama is composed without the block compensator (see _compose_panorama).
+
+    Args:
+        images (list): BGR images (numpy.ndarray, uint8).
+        pairs (list): Optional preflight pairs, see estimate_exposure_gains.
+
+    Returns:
+        numpy.ndarray: The applied gains, shape (len(images), 3), or None if no overlap could
+            be measured and the images were left untouched.
+    """
+    gains, measured = estimate_exposure_gains(images, pairs)
+    if not measured:
+        print("    [stitcher] ⚠️ No overlaps measured for exposure normalisation; leaving images unchanged.")
+        return None
+    levels = np.arange(256, dtype=np.float32)
+    for image, gain in zip(images, gains):
+        if np.abs(gain - 1.0).max() < GAIN_TOLERANCE:
+            continue
+        # One 256-entry table per channel: a LUT is a single memory pass, no float copy of the image.
+        lut = np.clip(levels[:, None] * gain[None, :].astype(np.float32) + 0.5, 0, 255).astype(np.uint8)
+        cv2.LUT(image, lut.reshape(1, 256, 3), dst=image)
+    return gains
+
+
+def _scaled_k(camera, scale):
+    """Camera intrinsics as float32 with focal length and principal point scaled from work to target resolution."""
+    K = camera.K().astype(np.float32)
+    K[0, 0] *= scale
+    K[0, 2] *= scale
+    K[1, 1] *= scale
+    K[1, 2] *= scale
+    return K
+
+
+def _compose_panorama(stitcher, images, compensator=cv2.detail.ExposureCompensator_NO):
+    """
+    Composes the panorama for cameras found by stitcher.estimateTransform, like composePanorama().
+
+    cv2.Stitcher offers no way to change its exposure compensator from Python, so this repeats
+    Stitcher::composePanorama step for step (spherical warp, graph-cut seams at seam resolution,
+    multi-band blending at full resolution) with `compensator` in place of the default block
+    gain compensator. With ExposureCompensator_GAIN_BLOCKS the result matches composePanorama().
+
+    Args:
+        stitcher (cv2.Stitcher): A stitcher whose estimateTransform(images) succeeded.
+        images (list): The images passed to estimateTransform.
+        compensator (int): A cv2.detail.ExposureCompensator_* type.
+
+    Returns:
+        numpy.ndarray: The panorama (BGR, uint8).
+    """
+    cameras = stitcher.cameras()
+    images = [images[i] for i in stitcher.component()]
+    work_scale = stitcher.workScale()
+    interpolation = stitcher.interpolationFlags()
+    height, width = images[0].shape[:2]
+    seam_scale = min(1.0, math.sqrt(stitcher.seamEstimationResol() * 1e6 / (width * height)))
+    warped_image_scale = float(np.median([camera.focal for camera in cameras]))
+
+    # Seams (and the exposure model) are estimated on small copies.
+    seam_work_aspect = seam_scale / work_scale
+    warper = cv2.PyRotationWarper(COMPOSE_WARPER, warped_image_scale * seam_work_aspect)
+    corners, seam_images, seam_masks = [], [], []
+    for image, camera in zip(images, cameras):
+        small = cv2.resize(image, None, fx=seam_scale, fy=seam_scale, interpolation=cv2.INTER_LINEAR_EXACT)
+        K = _scaled_k(camera, seam_work_aspect)
+        corner, warped = warper.warp(small, K, camera.R, interpolation, cv2.BORDER_REFLECT)
+        _, mask = warper.warp(np.full(small.shape[:2], 255, np.uint8), K, camera.R, cv2.INTER_NEAREST, cv2.BORDER_CONSTANT)
+        corners.append(corner)
+        seam_images.append(warped)
+        seam_masks.append(mask)
+
+    exposure = cv2.detail.ExposureCompensator_createDefault(compensator)
+    exposure.feed(corners=corners, images=seam_images, masks=seam_masks)
+    for index, (corner, warped, mask) in enumerate(zip(corners, seam_images, seam_masks)):
+        exposure.apply(index, corner, warped, mask)
+    seam_finder = cv2.detail_GraphCutSeamFinder('COST_COLOR')
+    seam_masks = seam_finder.find([warped.astype(np.float32) for warped in seam_images], corners, seam_masks)
+
+    # Compose at full resolution.
+    compose_work_aspect = 1.0 / work_scale
+    warper = cv2.PyRotationWarper(COMPOSE_WARPER, warped_image_scale * compose_work_aspect)
+    intrinsics = [_scaled_k(camera, compose_work_aspect) for camera in cameras]
+    rois = [warper.warpRoi((image.shape[1], image.shape[0]), K, camera.R) for image, K, camera in zip(images, intrinsics, cameras)]
+    blender = cv2.detail_MultiBandBlender(0, COMPOSE_BLEND_BANDS)
+    blender.prepare(cv2.detail.resultRoi(corners=[roi[:2] for roi in rois], sizes=[roi[2:] for roi in rois]))
+    for index, (image, K, camera) in enumerate(zip(images, intrinsics, cameras)):
+        corner, warped = warper.warp(image, K, camera.R, interpolation, cv2.BORDER_REFLECT)
+        _, mask = warper.warp(np.full(image.shape[:2], 255, np.uint8), K, camera.R, cv2.INTER_NEAREST, cv2.BORDER_CONSTANT)
+        exposure.apply(index, corner, warped, mask)
+        seam_mask = cv2.resize(cv2.dilate(seam_masks[index], None), (mask.shape[1], mask.shape[0]), interpolation=cv2.INTER_LINEAR_EXACT)
+        blender.feed(warped.astype(np.int16), cv2.bitwise_and(seam_mask, mask), corner)
+    result, _ = blender.blend(None, None)
+    return np.clip(result, 0, 255).astype(np.uint8)
+
+
+def stitch_images(image_paths, output_path, normalize=True, on_stage=None, pairs=None):
     """
     Stitches images together to create a panorama and attempts to remove black areas.
 
     Args:
         image_paths (list): List of paths to the images to stitch.
         output_path (str): Path to save the stitched panorama.
+        normalize (bool): Equalise exposure/white balance before stitching (see normalize_exposure)
+            and compose without the stitcher's block gain compensator, which is then redundant.
+        on_stage (callable): Optional callback, called with a stage name as each stage finishes:
+            "decoded", "normalized", "matched" (feature detection, matching and camera
+            estimation, which OpenCV runs as one step), "composited", "cropped", "saved".
+        pairs (list): Optional 'pairs' from preflight_image_set for the same image_paths,
+            reused by the exposure normalisation instead of matching the images again.
 
     Returns:
         tuple: (bool, numpy.ndarray)
             - The first element is a boolean indicating success (True) or failure (False).
             - The second element is the stitched image as a numpy.ndarray if successful, None otherwise.
     """
-    images = [cv2.imread(path) for path in image_paths if path]
+    report = on_stage or (lambda stage: None)
+
+    images = []
+    kept = {}  # index in image_paths -> index in images
+    for index, path in enumerate(image_paths):
+        image = cv2.imread(path) if path else None
+        if image is not None:
+            kept[index] = len(images)
+            images.append(image)
+    report('decoded')
 
     if len(images) < 2:
         return False, None  # Need at least 2 images to stitch
 
-    stitcher = cv2.Stitcher_create()
-    status, stitched = stitcher.stitch(images)
+    gains = None
+    if normalize:
+        if pairs is not None:
+            pairs = [dict(pair, a=kept[pair['a']], b=kept[pair['b']]) for pair in pairs
+                     if pair['a'] in kept and pair['b'] in kept]
+        gains = normalize_exposure(images, pairs)
+        report('normalized')
+
+    # estimateTransform + composePanorama is exactly what stitch() does, split so progress can be reported.
+    stitcher = get_stitcher()
+    status = stitcher.estimateTransform(images)
+    if status == cv2.Stitcher_OK:
+        report('matched')
+        if gains is not None:
+            stitched = _compose_panorama(stitcher, images)
+        else:
+            # Nothing was equalised, so keep the stitcher's own block gain compensation.
+            status, stitched = stitcher.composePanorama()
 
     if status == cv2.Stitcher_OK:
+        report('composited')
         stitched_image = stitched
         # Attempt to remove black borders
         stitched_image = remove_black_borders(stitched_image)
+        report('cropped')
         cv2.imwrite(output_path, stitched_image)
+        report('saved')
         return True, stitched_image
     else:
         print("Stitching failed with status code:", status)
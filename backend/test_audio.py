@@ -0,0 +1,91 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+import app as app_module
+from audio import AudioDecodeError, find_ffmpeg, process_narration
+from local_supabase import LocalQuery, LocalSupabase, LocalSupabaseError
+
+pytestmark = pytest.mark.skipif(find_ffmpeg() is None, reason="ffmpeg is not available")
+
+
+def write_tone(path, seconds=1.0, rate=16000):
+    t = np.arange(int(seconds * rate)) / rate
+    samples = (np.sin(2 * np.pi * 440 * t) * 12000).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.tobytes())
+
+
+def test_narration_is_transcoded_and_measured(tmp_path):
+    source = str(tmp_path / 'tone.wav')
+    write_tone(source)
+
+    path, meta = process_narration(source, str(tmp_path / 'narration.mp3'))
+
+    assert path.endswith('narration.mp3')
+    assert meta['duration_seconds'] == pytest.approx(1.0, abs=0.1)
+    assert meta['waveform_peaks']
+
+
+def test_undecodable_upload_is_a_client_error(tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    junk = tmp_path / 'junk.mp3'
+    junk.write_bytes(b'not audio at all' * 200)
+
+    with pytest.raises(AudioDecodeError):
+        process_narration(str(junk), str(tmp_path / 'narration.mp3'))
+
+    response = app_module.app.test_client().post('/upload-audio', data={
+        'tourId': 'tour-a', 'roomName': 'Kitchen', 'audio': (io.BytesIO(junk.read_bytes()), 'junk.mp3'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+@pytest.fixture
+def db_without_audio_meta(monkeypatch):
+    """A database where sql/tour_audio_meta.sql has not been applied yet."""
+    client = LocalSupabase()
+    client.seed(app_module.SUPABASE_TOURS_TABLE, [{'tour_id': 'tour-a', 'start_room': 'Kitchen'}])
+    client.seed(app_module.SUPABASE_PANORAMAS_TABLE, [{'tour_id': 'tour-a', 'room_name': 'Kitchen', 'panorama_url': 'k.jpg'}])
+    client.seed(app_module.SUPABASE_TOUR_AUDIO_TABLE, [{'tour_id': 'tour-a', 'room_name': 'Kitchen', 'audio_url': 'k.mp3'}])
+    execute = LocalQuery.execute
+
+    def execute_without_meta_columns(query):
+        mentioned = set(query._columns or []) | set(query._payload or {})
+        if query._table == app_module.SUPABASE_TOUR_AUDIO_TABLE and mentioned & set(app_module.TOUR_AUDIO_META_COLUMNS):
+            raise LocalSupabaseError("column tour_audio.duration_seconds does not exist")
+        return execute(query)
+
+    monkeypatch.setattr(LocalQuery, 'execute', execute_without_meta_columns)
+    monkeypatch.setattr(app_module, 'supabase', client)
+    return client
+
+
+def test_tour_data_serves_narration_without_the_metadata_columns(db_without_audio_meta):
+    response = app_module.app.test_client().get('/get-tour-data/tour-a')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['audioUrls'] == {'Kitchen': 'k.mp3'}
+    assert body['audioMeta'] == {'Kitchen': {'durationSeconds': None, 'waveformPeaks': None}}
+
+
+def test_narration_upload_is_saved_without_the_metadata_columns(tmp_path, monkeypatch, db_without_audio_meta):
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    source = tmp_path / 'tone.wav'
+    write_tone(str(source))
+
+    response = app_module.app.test_client().post('/upload-audio', data={
+        'tourId': 'tour-a', 'roomName': 'Kitchen', 'audio': (io.BytesIO(source.read_bytes()), 'tone.wav'),
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    rows = db_without_audio_meta.tables[app_module.SUPABASE_TOUR_AUDIO_TABLE]
+    assert len(rows) == 1 and rows[0]['audio_url'] == response.get_json()['audioUrl']
+    assert 'duration_seconds' not in rows[0]
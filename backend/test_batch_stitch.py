@@ -0,0 +1,82 @@
+import json
+import os
+
+import pytest
+
+from batch_stitch import build_report, discover_rooms, load_checkpoint, output_path_for, run_batch
+
+
+def test_output_path_mirrors_room_id(tmp_path):
+    output_dir = str(tmp_path)
+
+    assert output_path_for(output_dir, 'house/kitchen') == os.path.join(output_dir, 'house', 'kitchen_panorama.jpg')
+    assert output_path_for(output_dir, '/house/kitchen/') == os.path.join(output_dir, 'house', 'kitchen_panorama.jpg')
+
+
+@pytest.mark.parametrize('room_id', ['../x', 'house/../../x', '../../etc/cron'])
+def test_output_path_rejects_room_ids_outside_output_dir(tmp_path, room_id):
+    with pytest.raises(ValueError):
+        output_path_for(str(tmp_path / 'out'), room_id)
+
+
+def touch_images(directory, names):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (directory / name).write_bytes(b'')
+
+
+def test_discover_rooms_finds_directories_with_two_or_more_images(tmp_path):
+    touch_images(tmp_path / 'house' / 'kitchen', ['2.jpg', '1.JPG', 'notes.txt'])
+    touch_images(tmp_path / 'house' / 'hall', ['only.png'])
+    touch_images(tmp_path / 'flat', ['a.webp', 'b.png'])
+
+    rooms = discover_rooms(str(tmp_path))
+
+    assert sorted(rooms) == ['flat', 'house/kitchen']
+    assert [os.path.basename(p) for p in rooms['house/kitchen']] == ['1.JPG', '2.jpg']
+
+
+def test_run_batch_skips_rooms_already_in_the_checkpoint(tmp_path):
+    checkpoint_path = str(tmp_path / 'checkpoint.jsonl')
+    with open(checkpoint_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'room_id': 'kitchen', 'success': True, 'seconds': 1.5}) + '\n')
+        f.write(json.dumps({'room_id': 'hall', 'success': False, 'seconds': 0.5}) + '\n')
+        f.write('{"room_id": "trunc')
+
+    # Only the failed room is retried, and its bad id fails without starting a pool.
+    rooms = {'kitchen': ['a.jpg', 'b.jpg'], '../hall': ['c.jpg', 'd.jpg']}
+    results, skipped = run_batch(rooms, str(tmp_path / 'out'), checkpoint_path, workers=1)
+
+    assert [r['room_id'] for r in skipped] == ['kitchen']
+    assert [r['room_id'] for r in results] == ['../hall']
+    assert not results[0]['success'] and 'ValueError' in results[0]['error']
+    assert set(load_checkpoint(checkpoint_path)) == {'kitchen'}
+
+
+def test_run_batch_records_bad_room_ids_as_failures(tmp_path):
+    checkpoint_path = str(tmp_path / 'checkpoint.jsonl')
+
+    results, skipped = run_batch({'../escape': ['a.jpg', 'b.jpg']}, str(tmp_path / 'out'), checkpoint_path)
+    report = build_report(results, skipped, 2.0)
+
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        assert json.loads(f.readline())['room_id'] == '../escape'
+    assert report['failed'] == 1 and report['stitched'] == 0
+    assert report['failures'][0]['room_id'] == '../escape'
+
+
+def test_build_report_summarises_results_and_skips():
+    results = [
+        {'room_id': 'b', 'success': True, 'seconds': 2.0},
+        {'room_id': 'a', 'success': False, 'seconds': 0.5, 'error': 'Stitching failed'},
+    ]
+    skipped = [{'room_id': 'c', 'success': True, 'seconds': 9.0}]
+
+    report = build_report(results, skipped, 3.14159)
+
+    assert report['total_rooms'] == 3
+    assert (report['stitched'], report['failed'], report['skipped_from_checkpoint']) == (1, 1, 1)
+    assert report['wall_seconds'] == 3.142
+    assert report['room_seconds_total'] == 2.5 and report['room_seconds_max'] == 2.0
+    assert [r['room_id'] for r in report['rooms']] == ['a', 'b']
+    assert report['failures'] == [{'room_id': 'a', 'error': 'Stitching failed'}]
@@ -0,0 +1,142 @@
+import threading
+
+import pytest
+
+import app as app_module
+from local_supabase import LocalSupabase, LocalUniqueViolation
+
+TOUR = 'tour-a'
+OTHER_TOUR = 'tour-b'
+
+
+def marker_row(tour_id, room, marker_id, to_room='Hall'):
+    return {'id': marker_id, 'marker_id': marker_id, 'tour_id': tour_id, 'from_room': room, 'to_room': to_room,
+            'position_x': 0.0, 'position_y': 0.0}
+
+
+def marker(marker_id, link_to='Hall'):
+    return {'id': marker_id, 'linkTo': link_to, 'position_x': 1.0, 'position_y': 0.5}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    client = LocalSupabase()
+    client.seed(app_module.SUPABASE_TOURS_TABLE, [{'tour_id': TOUR, 'start_room': 'Kitchen'}, {'tour_id': OTHER_TOUR, 'start_room': 'Attic'}])
+    client.seed(app_module.SUPABASE_PANORAMAS_TABLE, [
+        {'tour_id': TOUR, 'room_name': 'Kitchen', 'panorama_url': 'k.jpg'},
+        {'tour_id': TOUR, 'room_name': 'Hall', 'panorama_url': 'h.jpg'},
+        {'tour_id': OTHER_TOUR, 'room_name': 'Attic', 'panorama_url': 'a.jpg'},
+    ])
+    client.seed(app_module.SUPABASE_MARKERS_TABLE, [
+        marker_row(TOUR, 'Kitchen', 'm1'),
+        marker_row(TOUR, 'Hall', 'm2', to_room='Kitchen'),
+        marker_row(OTHER_TOUR, 'Attic', 'victim', to_room='Attic'),
+    ])
+    monkeypatch.setattr(app_module, 'supabase', client)
+    return client
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+def save_markers(client, changes, base_revision=0, room='Kitchen', tour_id=TOUR):
+    return client.post('/save-markers', json={'tourId': tour_id, 'roomFrom': room, 'baseRevision': base_revision, 'changes': changes})
+
+
+def markers_in(db, **filters):
+    return [row for row in db.tables[app_module.SUPABASE_MARKERS_TABLE] if all(row.get(k) == v for k, v in filters.items())]
+
+
+def test_change_set_updates_marker_in_place(db, client):
+    response = save_markers(client, {'added': [marker('m3')], 'updated': [marker('m1', link_to='Kitchen')]})
+
+    assert response.status_code == 200
+    assert response.get_json()['revision'] == 1
+    assert {row['marker_id']: row['to_room'] for row in markers_in(db, tour_id=TOUR, from_room='Kitchen')} == {'m1': 'Kitchen', 'm3': 'Hall'}
+
+
+def test_change_set_cannot_take_over_another_tours_marker(db, client):
+    response = save_markers(client, {'updated': [marker('victim')]})
+
+    assert response.status_code == 400
+    assert markers_in(db, marker_id='victim')[0]['tour_id'] == OTHER_TOUR
+    assert app_module.get_room_revision(TOUR, 'Kitchen', 'markers') == 0
+
+
+def test_failed_write_does_not_advance_revision(db, client, monkeypatch):
+    original = app_module.apply_change_set
+
+    def failing_apply(*args, **kwargs):
+        raise Exception("database unavailable")
+
+    monkeypatch.setattr(app_module, 'apply_change_set', failing_apply)
+    assert save_markers(client, {'added': [marker('m3')]}).status_code == 500
+
+    monkeypatch.setattr(app_module, 'apply_change_set', original)
+    retry = save_markers(client, {'added': [marker('m3')]})
+    assert retry.status_code == 200
+    assert retry.get_json()['revision'] == 1
+
+
+def test_delete_room_rejects_stale_change_sets(db, client):
+    assert client.post('/delete-room', json={'tourId': TOUR, 'roomName': 'Kitchen'}).status_code == 200
+
+    stale = save_markers(client, {'updated': [marker('m1')]})
+    assert stale.status_code == 409
+    assert not markers_in(db, marker_id='m1')
+    # Hall's marker pointed at the deleted room, so Hall's markers moved on too.
+    assert app_module.get_room_revision(TOUR, 'Hall', 'markers') == 1
+
+
+def test_rename_room_moves_revisions(db, client):
+    assert save_markers(client, {'added': [marker('m3')]}).get_json()['revision'] == 1
+
+    response = client.post('/rename-room', json={'tourId': TOUR, 'oldRoomName': 'Kitchen', 'newRoomName': 'Galley'})
+
+    assert response.status_code == 200
+    # The old name moves on too, so an editor still showing it cannot write orphan markers.
+    assert app_module.get_room_revision(TOUR, 'Kitchen', 'markers') == 2
+    assert app_module.get_room_revision(TOUR, 'Kitchen', 'tooltips') == 1
+    assert app_module.get_room_revision(TOUR, 'Galley', 'markers') == 3
+    for base_revision in (0, 1):
+        assert save_markers(client, {'added': [marker('orphan')]}, base_revision=base_revision).status_code == 409
+    assert not markers_in(db, marker_id='orphan')
+    assert save_markers(client, {'updated': [marker('m1')]}, base_revision=1, room='Galley').status_code == 409
+
+    revisions = client.get(f'/get-tour-data/{TOUR}').get_json()['revisions']
+    assert revisions['Galley'] == {'markers': 3, 'tooltips': 2}
+    assert 'Kitchen' not in revisions
+
+
+def test_racing_saves_on_one_revision_leave_only_the_winners_changes(db):
+    db.db_latency.seconds = 0.01  # Spread each save over several round-trips so the two interleave.
+    start = threading.Barrier(2)
+    responses = {}
+
+    def save(marker_id):
+        test_client = app_module.app.test_client()
+        start.wait()
+        responses[marker_id] = save_markers(test_client, {'added': [marker(marker_id)], 'removed': ['m1']})
+
+    threads = [threading.Thread(target=save, args=(marker_id,)) for marker_id in ('mA', 'mB')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    statuses = sorted(response.status_code for response in responses.values())
+    assert statuses == [200, 409]
+    winner = next(marker_id for marker_id, response in responses.items() if response.status_code == 200)
+    assert [row['marker_id'] for row in markers_in(db, tour_id=TOUR, from_room='Kitchen')] == [winner]
+    assert app_module.get_room_revision(TOUR, 'Kitchen', 'markers') == 1
+
+
+def test_revision_rows_are_unique_per_room_and_kind(db):
+    row = {'tour_id': TOUR, 'room_name': 'Kitchen', 'kind': 'markers', 'revision': 1}
+    db.table(app_module.SUPABASE_ROOM_REVISIONS_TABLE).insert(row).execute()
+
+    with pytest.raises(LocalUniqueViolation):
+        db.table(app_module.SUPABASE_ROOM_REVISIONS_TABLE).insert(dict(row, revision=7)).execute()
+    assert app_module.get_room_revision(TOUR, 'Kitchen', 'markers') == 1
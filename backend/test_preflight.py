@@ -0,0 +1,65 @@
+import glob
+import os
+
+import cv2
+import numpy as np
+
+from preflight import MAX_PAIRS_PER_IMAGE, THUMBNAIL_MAX_SIDE, load_thumbnail, preflight_image_set
+
+TEST_IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'test images')
+
+
+def image_set(prefix):
+    return sorted(glob.glob(os.path.join(TEST_IMAGES_DIR, f"{prefix}*.jpg")))
+
+
+def write_pan_frames(tmp_path, count, step=200, width=640):
+    """Writes `count` frames panning across a textured wall, each overlapping the next by width - step pixels."""
+    rng = np.random.default_rng(3)
+    wall = cv2.GaussianBlur(rng.integers(0, 255, size=(480, count * step + width, 3), dtype=np.uint8), (5, 5), 0)
+    paths = []
+    for i in range(count):
+        path = str(tmp_path / f"frame_{i:02d}.jpg")
+        cv2.imwrite(path, wall[:, i * step:i * step + width])
+        paths.append(path)
+    return paths
+
+
+def test_unmatched_overlap_is_only_a_warning():
+    # ORB on thumbnails cannot match w1-w3, but the stitcher handles them at full resolution.
+    report = preflight_image_set(image_set('w'))
+
+    assert report['ok']
+    codes = [issue['code'] for image in report['images'] for issue in image['issues']]
+    assert 'no_overlap' in codes
+
+
+def test_thumbnail_size_does_not_depend_on_source_size(tmp_path):
+    source = image_set('w')[0]
+    small_path = str(tmp_path / 'small.jpg')
+    image = cv2.imread(source)
+    cv2.imwrite(small_path, cv2.resize(image, (image.shape[1] // 5, image.shape[0] // 5), interpolation=cv2.INTER_AREA))
+
+    for path in (source, small_path):
+        assert max(load_thumbnail(path).shape[:2]) == THUMBNAIL_MAX_SIDE
+
+
+def test_ordered_sets_only_match_nearby_frames(tmp_path):
+    paths = write_pan_frames(tmp_path, 24)
+
+    report = preflight_image_set(paths)
+
+    assert report['ok']
+    assert len(report['pairs']) == 2 * len(paths)
+    assert all(abs(pair['a'] - pair['b']) <= 2 or abs(pair['a'] - pair['b']) >= len(paths) - 2 for pair in report['pairs'])
+    assert not [issue for image in report['images'] for issue in image['issues']]
+
+
+def test_out_of_order_frames_are_matched_further_afield(tmp_path):
+    paths = write_pan_frames(tmp_path, 8)
+    shuffled = [paths[i] for i in (0, 5, 2, 7, 4, 1, 6, 3)]
+
+    report = preflight_image_set(shuffled)
+
+    assert len(report['pairs']) <= MAX_PAIRS_PER_IMAGE * len(paths)
+    assert all(image['best_overlap'] >= 0.3 for image in report['images'])
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from projection import RemapCache, cylindrical_to_equirect, equirect_to_cubemap, equirect_to_cylindrical
+
+
+def direction_image(width=512, height=256):
+    """Equirectangular float image whose pixels hold their own unit view direction (x right, y up, z front)."""
+    lon = (np.arange(width, dtype=np.float32) + 0.5) / width * 2 * np.pi - np.pi
+    lat = np.pi / 2 - (np.arange(height, dtype=np.float32) + 0.5) / height * np.pi
+    lon, lat = np.meshgrid(lon, lat)
+    return np.dstack([np.cos(lat) * np.sin(lon), np.sin(lat), np.cos(lat) * np.cos(lon)]).astype(np.float32)
+
+
+def unit(vector):
+    vector = np.asarray(vector, np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_cube_poles_do_not_sample_the_opposite_pole():
+    image = np.full((256, 512, 3), 128, np.uint8)
+    image[:32] = (0, 0, 255)    # north pole rows
+    image[-32:] = (255, 0, 0)   # south pole rows
+
+    # Faces larger than the source put samples within half a row of the poles.
+    faces = equirect_to_cubemap(image, face_size=512, cache=RemapCache())
+
+    centre = slice(192, 320)
+    assert faces['up'][centre, centre, 0].max() == 0
+    assert faces['down'][centre, centre, 2].max() == 0
+
+
+def test_longitude_wraps_across_the_seam():
+    image = np.zeros((256, 512), np.uint8)
+    image[:, 0] = image[:, -1] = 200
+
+    cylinder = equirect_to_cylindrical(image, cache=RemapCache())
+
+    # The seam columns sample each other rather than black padding.
+    assert cylinder[:, 0].min() >= 100
+    assert cylinder[:, -1].min() >= 100
+
+
+def test_cylinder_seam_wraps_back_to_equirect():
+    cylinder = np.zeros((256, 512), np.uint8)
+    cylinder[:, 0] = cylinder[:, -1] = 200
+
+    # Upsampling puts the outermost samples between the last column and the first.
+    image = cylindrical_to_equirect(cylinder, width=1024, cache=RemapCache())
+
+    # Rows inside the cylinder's field of view sample across the seam; those beyond it stay black.
+    assert image[128:384, 0].min() >= 190
+    assert image[128:384, -1].min() >= 190
+    assert image[:8].max() == 0 and image[-8:].max() == 0
+
+
+# Face centre, the direction a quarter of the face above it and a quarter to its right,
+# as seen by a viewer at the centre of the cube facing that face (up faces: front is below).
+FACE_DIRECTIONS = {
+    'front': ((0, 0, 1), (0, 1, 0), (1, 0, 0)),
+    'back': ((0, 0, -1), (0, 1, 0), (-1, 0, 0)),
+    'right': ((1, 0, 0), (0, 1, 0), (0, 0, -1)),
+    'left': ((-1, 0, 0), (0, 1, 0), (0, 0, 1)),
+    'up': ((0, 1, 0), (0, 0, -1), (1, 0, 0)),
+    'down': ((0, -1, 0), (0, 0, 1), (1, 0, 0)),
+}
+
+
+@pytest.mark.parametrize('face', list(FACE_DIRECTIONS))
+def test_cube_faces_are_oriented(face):
+    faces = equirect_to_cubemap(direction_image(), face_size=128, cache=RemapCache())
+    centre, up, right = (np.float32(v) for v in FACE_DIRECTIONS[face])
+
+    assert faces[face][64, 64] == pytest.approx(unit(centre), abs=0.03)
+    assert faces[face][32, 64] == pytest.approx(unit(centre + 0.5 * up), abs=0.03)
+    assert faces[face][64, 96] == pytest.approx(unit(centre + 0.5 * right), abs=0.03)
+
+
+def test_cache_evicts_the_least_recently_used_tables():
+    cache = RemapCache(max_entries=2)
+    image = np.zeros((32, 64), np.uint8)
+
+    for width in (64, 96, 64, 128):
+        equirect_to_cylindrical(image, width=width, cache=cache)
+    equirect_to_cylindrical(image, width=64, cache=cache)   # still cached: used after 96
+    equirect_to_cylindrical(image, width=96, cache=cache)   # evicted by 128
+
+    assert cache.stats() == {'entries': 2, 'max_entries': 2, 'hits': 2, 'misses': 4, 'disk_loads': 0}
+
+
+def test_tables_on_disk_are_memory_mapped_by_later_caches(tmp_path):
+    image = direction_image(256, 128)
+    expected = equirect_to_cubemap(image, face_size=64, cache=RemapCache())
+
+    equirect_to_cubemap(image, face_size=64, cache=RemapCache(cache_dir=str(tmp_path)))
+    reloaded = RemapCache(cache_dir=str(tmp_path))
+    faces = equirect_to_cubemap(image, face_size=64, cache=reloaded)
+
+    assert len(list(tmp_path.glob('equirect_to_cubemap_*.npy'))) == 2
+    assert reloaded.stats()['disk_loads'] == 1
+    assert all(isinstance(table, np.memmap) for table in next(iter(reloaded._entries.values())))
+    for face in expected:
+        np.testing.assert_array_equal(faces[face], expected[face])
@@ -0,0 +1,67 @@
+import glob
+import os
+import threading
+import time
+
+import pytest
+
+from stitch_worker import StitchWorkerPool
+
+TEST_IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'test images')
+
+
+def test_pool_stitches_in_warm_worker(tmp_path):
+    pool = StitchWorkerPool(processes=1)
+    try:
+        image_paths = sorted(glob.glob(os.path.join(TEST_IMAGES_DIR, 'h*.jpg')))
+        success, stitched = pool.stitch(image_paths, str(tmp_path / 'pano.jpg'))
+    finally:
+        pool.close()
+
+    assert success
+    assert stitched is not None
+    assert pool.latency_report()['first']['count'] == 1
+
+
+def test_pool_streams_stage_events(tmp_path):
+    pool = StitchWorkerPool(processes=1)
+    stages = []
+    try:
+        image_paths = sorted(glob.glob(os.path.join(TEST_IMAGES_DIR, 'h*.jpg')))
+        success, _ = pool.stitch(image_paths, str(tmp_path / 'pano.jpg'), on_stage=lambda stage, seconds=None: stages.append(stage))
+    finally:
+        pool.close()
+
+    assert success
+    assert stages == [stage for stage, _ in pool._timings[0]['stages']]
+    assert stages
+
+
+def test_pool_fails_fast_when_workers_cannot_initialise():
+    # cv2.setNumThreads rejects a non-integer, so every worker's initializer fails.
+    with pytest.raises(Exception, match="failed to initialise"):
+        StitchWorkerPool(processes=1, opencv_threads='not-a-number')
+
+
+def test_concurrent_first_requests_start_one_pool(monkeypatch):
+    import app as app_module
+
+    created = []
+
+    class SlowPool:
+        def __init__(self, processes, opencv_threads):
+            time.sleep(0.05)  # Starting real workers takes a while; give racing threads time to overlap.
+            created.append(self)
+
+    monkeypatch.setattr(app_module, 'StitchWorkerPool', SlowPool)
+    monkeypatch.setattr(app_module, 'STITCH_WORKERS', 2)
+    monkeypatch.setattr(app_module, 'stitch_worker_pool', None)
+    pools = []
+    threads = [threading.Thread(target=lambda: pools.append(app_module.get_stitch_worker_pool())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(pool is created[0] for pool in pools)
@@ -0,0 +1,100 @@
+import glob
+import os
+
+import cv2
+import numpy as np
+
+from preflight import preflight_image_set
+from stitcher import _compose_panorama, estimate_exposure_gains, normalize_exposure, stitch_images
+
+TEST_IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'test images')
+
+
+def image_set(prefix):
+    return sorted(glob.glob(os.path.join(TEST_IMAGES_DIR, f"{prefix}*.jpg")))
+
+
+def test_stitch_images_produces_panorama(tmp_path):
+    image_paths = image_set('h')
+    output_path = str(tmp_path / 'pano.jpg')
+
+    success, stitched = stitch_images(image_paths, output_path)
+
+    assert success
+    widest = max(cv2.imread(path).shape[1] for path in image_paths)
+    assert stitched.shape[1] > widest
+    assert os.path.exists(output_path)
+
+
+def test_stitch_images_reuses_preflight_pairs(tmp_path):
+    image_paths = image_set('h')
+    report = preflight_image_set(image_paths)
+    assert report['ok']
+
+    success, _ = stitch_images(image_paths, str(tmp_path / 'pano.jpg'), pairs=report['pairs'])
+
+    assert success
+
+
+def test_exposure_gains_reuse_preflight_homographies():
+    image_paths = image_set('h')
+    images = [cv2.imread(path) for path in image_paths]
+    report = preflight_image_set(image_paths)
+
+    gains, measured = estimate_exposure_gains(images, report['pairs'])
+    matched_gains, matched = estimate_exposure_gains(images)
+
+    assert measured == sum(1 for pair in report['pairs'] if pair['homography'] is not None) > 0
+    assert matched > 0
+    assert abs(gains - matched_gains).max() < 0.05
+
+
+def test_exposure_gains_without_overlap_are_unity():
+    images = [cv2.imread(path) for path in image_set('h')]
+
+    gains, measured = estimate_exposure_gains(images, pairs=[])
+
+    assert measured == 0
+    assert (gains == 1.0).all()
+
+
+def overlap_colour_difference(images, pairs):
+    """Mean absolute B, G, R difference between the two sides of every overlap, averaged over the pairs."""
+    differences = []
+    for pair in pairs:
+        if pair['homography'] is None:
+            continue
+        a, b = images[pair['a']], images[pair['b']]
+        scale_a = np.diag([a.shape[1], a.shape[0], 1.0])
+        scale_b = np.diag([b.shape[1], b.shape[0], 1.0])
+        homography = scale_a @ np.asarray(pair['homography']) @ np.linalg.inv(scale_b)
+        mask_a = cv2.warpPerspective(np.full(b.shape[:2], 255, np.uint8), homography, (a.shape[1], a.shape[0]))
+        mask_b = cv2.warpPerspective(np.full(a.shape[:2], 255, np.uint8), np.linalg.inv(homography), (b.shape[1], b.shape[0]))
+        differences.append(np.abs(np.subtract(cv2.mean(a, mask=mask_a)[:3], cv2.mean(b, mask=mask_b)[:3])).mean())
+    return float(np.mean(differences))
+
+
+def test_normalisation_evens_out_overlaps():
+    image_paths = image_set('h')
+    images = [cv2.imread(path) for path in image_paths]
+    # Underexpose the middle frame and give it a blue cast.
+    images[1] = np.clip(images[1] * np.array([0.9, 0.7, 0.6]), 0, 255).astype(np.uint8)
+    pairs = preflight_image_set(image_paths)['pairs']
+    before = overlap_colour_difference(images, pairs)
+
+    normalize_exposure(images, pairs)
+
+    assert overlap_colour_difference(images, pairs) < before * 0.5
+
+
+def test_compose_with_block_gains_matches_the_stitcher():
+    images = [cv2.imread(path) for path in image_set('h')]
+    stitcher = cv2.Stitcher_create(cv2.Stitcher_PANORAMA)
+    assert stitcher.estimateTransform(images) == cv2.Stitcher_OK
+
+    composed = _compose_panorama(stitcher, images, cv2.detail.ExposureCompensator_GAIN_BLOCKS)
+    status, expected = stitcher.composePanorama()
+
+    assert status == cv2.Stitcher_OK
+    assert composed.shape == expected.shape
+    assert np.abs(composed.astype(int) - expected).mean() < 0.5
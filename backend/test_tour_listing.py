@@ -0,0 +1,118 @@
+import sqlite3
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import app as app_module
+from local_supabase import LocalSupabase
+from tour_listing import MAX_PAGE_SIZE, SqliteTourStore, SupabaseTourStore, encode_cursor, list_tours_page
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteTourStore(str(tmp_path / 'tours.db'))
+    conn = store._connection()
+    conn.executemany("insert into tour (tour_id, tour_name, start_room, created_at, updated_at) values (?, ?, ?, ?, ?)", [
+        (f"tour-{i}", f"Tour {i}", 'Kitchen', f"2026-01-0{i}T00:00:00.000Z", f"2026-01-0{i}T00:00:00.000Z")
+        for i in range(1, 6)
+    ])
+    conn.execute("insert into panoramas (tour_id, room_name, panorama_url) values ('tour-5', 'Kitchen', 'k.jpg')")
+    conn.commit()
+    return store
+
+
+def last_modified(store, tour_id):
+    tours = list_tours_page(store, limit=100)['tours']
+    return next(t['lastModified'] for t in tours if t['tourId'] == tour_id)
+
+
+def test_pages_follow_the_keyset(store):
+    first = list_tours_page(store, limit=2)
+    second = list_tours_page(store, limit=2, cursor=first['nextCursor'])
+    third = list_tours_page(store, limit=2, cursor=second['nextCursor'])
+
+    ids = [t['tourId'] for page in (first, second, third) for t in page['tours']]
+    assert ids == ['tour-5', 'tour-4', 'tour-3', 'tour-2', 'tour-1']
+    assert third['nextCursor'] is None
+    assert first['tours'][0]['thumbnailUrl'] == 'k.jpg'
+
+
+@pytest.mark.parametrize('statement', [
+    "update tour set tour_name = 'Renamed' where tour_id = 'tour-5'",
+    "update panoramas set panorama_url = 'k2.jpg' where tour_id = 'tour-5'",
+    "insert into tour_audio values ('tour-5', 'Kitchen', 'a.mp3')",
+    "delete from panoramas where tour_id = 'tour-5'",
+])
+def test_any_tour_change_advances_last_modified(store, statement):
+    before = last_modified(store, 'tour-5')
+    time.sleep(0.002)
+
+    conn = store._connection()
+    conn.execute(statement)
+    conn.commit()
+
+    assert last_modified(store, 'tour-5') > before
+    assert last_modified(store, 'tour-4') == '2026-01-04T00:00:00.000Z'
+
+
+def test_databases_without_updated_at_are_migrated(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute("create table tour (tour_id text primary key, tour_name text, start_room text, created_at text not null)")
+    conn.execute("create table panoramas (tour_id text, room_name text, panorama_url text, primary key (tour_id, room_name))")
+    conn.execute("insert into tour values ('old', 'Old', null, '2025-06-01T00:00:00.000Z')")
+    conn.execute("insert into panoramas values ('old', 'Hall', 'h.jpg')")
+    conn.commit()
+    conn.close()
+
+    tours = list_tours_page(SqliteTourStore(path))['tours']
+
+    assert tours[0]['lastModified'] == '2025-06-01T00:00:00.000Z'
+    assert tours[0]['thumbnailUrl'] == 'h.jpg'
+
+
+def test_thumbnail_is_preferred_over_the_full_panorama(store):
+    conn = store._connection()
+    conn.execute("update panoramas set thumbnail_url = 'k_thumb.jpg' where tour_id = 'tour-5'")
+    conn.commit()
+
+    assert list_tours_page(store, limit=1)['tours'][0]['thumbnailUrl'] == 'k_thumb.jpg'
+
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_limits_below_one_are_rejected(store, limit):
+    with pytest.raises(ValueError, match="limit"):
+        list_tours_page(store, limit=limit)
+
+
+def test_large_limits_are_capped(store):
+    conn = store._connection()
+    conn.executemany("insert into tour (tour_id, created_at) values (?, ?)", [
+        (f"bulk-{i:03d}", f"2025-01-01T00:00:{i % 60:02d}.{i:03d}Z") for i in range(MAX_PAGE_SIZE)
+    ])
+    conn.commit()
+
+    page = list_tours_page(store, limit=MAX_PAGE_SIZE * 10)
+
+    assert len(page['tours']) == MAX_PAGE_SIZE
+    assert page['nextCursor'] is not None
+
+
+def test_stitched_rooms_get_a_small_thumbnail(monkeypatch):
+    client = LocalSupabase()
+    monkeypatch.setattr(app_module, 'supabase', client)
+    panorama = np.zeros((2000, 4000, 3), dtype=np.uint8)
+
+    url = app_module.upload_thumbnail('tour-1', 'Living Room', panorama)
+
+    data = client.storage.from_(app_module.SUPABASE_BUCKET_NAME).download('tour-1/Living_Room_thumb.jpg')
+    thumbnail = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert url.endswith('tour-1/Living_Room_thumb.jpg')
+    assert thumbnail.shape[:2] == (app_module.THUMBNAIL_WIDTH // 2, app_module.THUMBNAIL_WIDTH)
+
+
+def test_supabase_store_rejects_a_cursor_that_is_not_a_tour_id():
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        list_tours_page(SupabaseTourStore(client=None), cursor=encode_cursor('2026-01-01T00:00:00Z', 'not-a-uuid'))
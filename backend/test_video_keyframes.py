@@ -0,0 +1,69 @@
+import functools
+import io
+
+import cv2
+import numpy as np
+
+import app as app_module
+from local_supabase import LocalSupabase
+from video_keyframes import DEFAULT_MAX_KEYFRAMES, extract_keyframes
+
+
+def write_pan(path, wall, seconds=10, fps=30, width=640):
+    height = wall.shape[0]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    frames = seconds * fps
+    for i in range(frames):
+        offset = int(i * (wall.shape[1] - width) / (frames - 1))
+        writer.write(np.ascontiguousarray(wall[:, offset:offset + width]))
+    writer.release()
+
+
+def test_low_texture_pan_falls_back_to_time_spacing(tmp_path, capsys):
+    # Fine vertical stripes are sharp but give ORB no corners to match, so overlap is never estimated.
+    stripes = (127 + 100 * np.sign(np.sin(np.arange(2560) / 3.0))).astype(np.uint8)
+    wall = cv2.cvtColor(np.tile(stripes, (360, 1)), cv2.COLOR_GRAY2BGR)
+    video_path = str(tmp_path / 'wall.avi')
+    write_pan(video_path, wall)
+
+    keyframes, truncated = extract_keyframes(video_path, str(tmp_path / 'keyframes'))
+
+    assert 5 <= len(keyframes) < DEFAULT_MAX_KEYFRAMES
+    assert not truncated
+    assert 'spaced by time' in capsys.readouterr().out
+
+
+def write_textured_pan(path):
+    rng = np.random.default_rng(1)
+    wall = cv2.GaussianBlur(rng.integers(0, 255, size=(360, 2560, 3), dtype=np.uint8), (5, 5), 0)
+    write_pan(path, wall)
+
+
+def test_keyframe_limit_is_reported(tmp_path, capsys):
+    video_path = str(tmp_path / 'pan.avi')
+    write_textured_pan(video_path)
+
+    keyframes, truncated = extract_keyframes(video_path, str(tmp_path / 'keyframes'), max_keyframes=2)
+
+    assert len(keyframes) == 2
+    assert truncated
+    assert 'Keyframe limit of 2 reached' in capsys.readouterr().out
+
+
+def test_truncated_videos_are_reported_to_the_client(tmp_path, monkeypatch):
+    video_path = tmp_path / 'pan.avi'
+    write_textured_pan(str(video_path))
+    client = LocalSupabase()
+    client.seed(app_module.SUPABASE_TOURS_TABLE, [{'tour_id': 'tour-a', 'start_room': 'Kitchen'}])
+    monkeypatch.setattr(app_module, 'supabase', client)
+    monkeypatch.setattr(app_module, 'PREFLIGHT_MODE', 'off')
+    monkeypatch.setattr(app_module, 'extract_keyframes', functools.partial(extract_keyframes, max_keyframes=2))
+    monkeypatch.setattr(app_module, 'run_stitch', lambda image_paths, output_path, **kwargs: (True, cv2.imread(image_paths[0])))
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+
+    response = app_module.app.test_client().post('/restitch-room', data={
+        'tourId': 'tour-a', 'roomName': 'Kitchen', 'files': (io.BytesIO(video_path.read_bytes()), 'pan.avi', 'video/x-msvideo'),
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    assert response.get_json()['truncatedVideos'] == ['pan.avi']
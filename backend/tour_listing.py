@@ -0,0 +1,213 @@
+"""
+Paginated tour listing for GET /tours.
+
+A page of tours comes back with room, marker and tooltip counts, the start
+room's thumbnail URL (its full panorama for rooms stitched before thumbnails
+were uploaded) and a last-modified timestamp, all computed
+by one aggregated query: the list_tours SQL function (sql/list_tours.sql) on
+Supabase, or the same query against a local SQLite database when
+TOUR_LISTING_SQLITE_PATH is set.
+
+Pages use keyset pagination on (created_at, tour_id), newest first, so a page
+costs the same however deep into the library it is. The cursor handed to
+clients is an opaque base64 token of the last row's sort key.
+
+The last-modified timestamp is tour.updated_at, which triggers advance on any
+write to the tour row or its panoramas, markers, tooltips and narration.
+"""
+import base64
+import json
+import sqlite3
+import threading
+import uuid
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+SQLITE_SCHEMA = '''
+create table if not exists tour (
+    tour_id text primary key,
+    tour_name text,
+    start_room text,
+    created_at text not null default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    updated_at text default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+create table if not exists panoramas (tour_id text, room_name text, panorama_url text, thumbnail_url text, primary key (tour_id, room_name));
+create table if not exists tour_audio (tour_id text, room_name text, audio_url text, primary key (tour_id, room_name));
+create table if not exists markers (id text primary key, tour_id text, from_room text, to_room text, position_x real, position_y real);
+create table if not exists tooltips (id text primary key, tour_id text, room_name text, content text, position_x real, position_y real);
+create table if not exists room_revisions (
+    tour_id text, room_name text, kind text, revision integer,
+    updated_at text default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    primary key (tour_id, room_name, kind)
+);
+create index if not exists panoramas_tour_id_idx on panoramas (tour_id);
+create index if not exists markers_tour_id_idx on markers (tour_id);
+create index if not exists tooltips_tour_id_idx on tooltips (tour_id);
+create index if not exists room_revisions_tour_id_idx on room_revisions (tour_id);
+create index if not exists tour_created_at_tour_id_idx on tour (created_at desc, tour_id desc);
+create trigger if not exists tour_touch after update on tour for each row when new.updated_at is old.updated_at
+begin
+    update tour set updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') where tour_id = new.tour_id;
+end;
+'''
+
+# SQLite twin of the touch_parent_tour triggers in sql/list_tours.sql (one trigger per table and operation).
+SQLITE_TOUCH_TRIGGER = '''
+create trigger if not exists {table}_touch_tour_{op} after {op} on {table} for each row
+begin
+    update tour set updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') where tour_id = {row}.tour_id;
+end;
+'''
+SQLITE_TOUCH_TRIGGERS = ''.join(
+    SQLITE_TOUCH_TRIGGER.format(table=table, op=op, row='old' if op == 'delete' else 'new')
+    for table in ('panoramas', 'markers', 'tooltips', 'tour_audio')
+    for op in ('insert', 'update', 'delete')
+)
+
+# SQLite twin of the list_tours function in sql/list_tours.sql.
+SQLITE_LIST_TOURS = '''
+select
+    t.tour_id,
+    t.tour_name,
+    t.start_room,
+    t.created_at,
+    (select count(*) from panoramas p where p.tour_id = t.tour_id) as room_count,
+    (select count(*) from markers m where m.tour_id = t.tour_id) as marker_count,
+    (select count(*) from tooltips tt where tt.tour_id = t.tour_id) as tooltip_count,
+    coalesce(
+        (select coalesce(p.thumbnail_url, p.panorama_url) from panoramas p where p.tour_id = t.tour_id and p.room_name = t.start_room limit 1),
+        (select coalesce(p.thumbnail_url, p.panorama_url) from panoramas p where p.tour_id = t.tour_id order by p.room_name limit 1)
+    ) as thumbnail_url,
+    coalesce(t.updated_at, t.created_at) as last_modified
+from tour t
+where :after_created_at is null or (t.created_at, t.tour_id) < (:after_created_at, :after_tour_id)
+order by t.created_at desc, t.tour_id desc
+limit :page_size
+'''
+
+
+def encode_cursor(created_at, tour_id):
+    """Packs a row's sort key into an opaque, URL-safe cursor."""
+    raw = json.dumps([created_at, tour_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Unpacks a cursor made by encode_cursor.
+
+    Returns:
+        tuple: (created_at, tour_id)
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, tour_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if not isinstance(created_at, str) or not isinstance(tour_id, str):
+        raise ValueError("Invalid cursor.")
+    return created_at, tour_id
+
+
+class SqliteTourStore:
+    """Local SQLite stand-in for the Supabase tables used by the tour listing."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            # Databases created before tour.updated_at or panoramas.thumbnail_url existed get the
+            # columns first; SQLite cannot add a column with a non-constant default, so old rows
+            # fall back to created_at and the full panorama.
+            for table, column in (('tour', 'updated_at'), ('panoramas', 'thumbnail_url')):
+                columns = [row['name'] for row in conn.execute(f"pragma table_info({table})")]
+                if columns and column not in columns:
+                    conn.execute(f"alter table {table} add column {column} text")
+            conn.executescript(SQLITE_SCHEMA + SQLITE_TOUCH_TRIGGERS)
+
+    def _connection(self):
+        # sqlite3 connections may not be shared across threads; keep one per thread.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def list_tours(self, page_size, after=None):
+        after_created_at, after_tour_id = after or (None, None)
+        rows = self._connection().execute(SQLITE_LIST_TOURS, {
+            'page_size': page_size,
+            'after_created_at': after_created_at,
+            'after_tour_id': after_tour_id,
+        }).fetchall()
+        return [dict(row) for row in rows]
+
+
+class SupabaseTourStore:
+    """Calls the list_tours SQL function (sql/list_tours.sql) through PostgREST."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def list_tours(self, page_size, after=None):
+        after_created_at, after_tour_id = after or (None, None)
+        if after_tour_id is not None:
+            # list_tours takes a uuid; reject a tampered cursor here rather than as a database error.
+            try:
+                uuid.UUID(after_tour_id)
+            except ValueError:
+                raise ValueError("Invalid cursor.")
+        response = self.client.rpc('list_tours', {
+            'page_size': page_size,
+            'after_created_at': after_created_at,
+            'after_tour_id': after_tour_id,
+        }).execute()
+        return response.data or []
+
+
+def list_tours_page(store, limit=None, cursor=None):
+    """
+    Fetches one page of tours.
+
+    Args:
+        store: SqliteTourStore or SupabaseTourStore.
+        limit (int): Page size; None means DEFAULT_PAGE_SIZE and larger values are capped at MAX_PAGE_SIZE.
+        cursor (str): nextCursor from the previous page, or None for the first page.
+
+    Returns:
+        dict: {"tours": [...], "nextCursor": str or None}
+
+    Raises:
+        ValueError: If limit is below 1 or the cursor is malformed.
+    """
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    if int(limit) < 1:
+        raise ValueError("limit must be at least 1.")
+    page_size = min(int(limit), MAX_PAGE_SIZE)
+    after = decode_cursor(cursor) if cursor else None
+
+    # One extra row tells us whether another page exists without a separate count query.
+    rows = store.list_tours(page_size + 1, after)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    tours = [{
+        'tourId': row['tour_id'],
+        'tourName': row.get('tour_name'),
+        'startRoom': row.get('start_room'),
+        'roomCount': row.get('room_count') or 0,
+        'markerCount': row.get('marker_count') or 0,
+        'tooltipCount': row.get('tooltip_count') or 0,
+        'thumbnailUrl': row.get('thumbnail_url'),
+        'createdAt': row.get('created_at'),
+        'lastModified': row.get('last_modified') or row.get('created_at'),
+    } for row in rows]
+
+    next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['tour_id']) if has_more and rows else None
+    return {'tours': tours, 'nextCursor': next_cursor}
@@ -0,0 +1,171 @@
+"""
+Keyframe selection from a room walkthrough video.
+
+The video is decoded as a stream with cv2.VideoCapture; only the last kept
+keyframe's features and the current best candidate frame are held in memory,
+so memory use does not depend on the video's length. Each kept frame is
+written to disk straight away and its path handed to stitch_images.
+
+A new keyframe is taken once the camera has panned far enough that overlap with
+the last kept frame is about to drop below MIN_OVERLAP; among the frames seen
+since overlap fell below MAX_OVERLAP, the sharpest one is kept.
+
+When overlap cannot be estimated at all (a low-texture wall gives ORB nothing to
+match), that says nothing about how far the camera moved, so keyframes are
+spaced evenly in time instead: one every FALLBACK_KEYFRAME_SECONDS, or further
+apart if that is needed for max_keyframes to cover the whole video.
+"""
+import os
+
+import cv2
+
+from preflight import ORB_FEATURES, blur_score, estimate_overlap
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.avi', '.mkv', '.webm', '.3gp')
+
+ANALYSIS_MAX_SIDE = 320
+# Keyframes should share roughly 35-70% of their view with the previous one.
+MIN_OVERLAP = 0.35
+MAX_OVERLAP = 0.70
+# Frames softer than this (Laplacian variance on the analysis thumbnail) are never kept.
+MIN_SHARPNESS = 25.0
+# Only every Nth frame is analysed; at 30 fps a slow pan moves little between frames.
+DEFAULT_FRAME_STEP = 3
+DEFAULT_MAX_KEYFRAMES = 30
+# Keyframe spacing while no overlap estimate is available.
+FALLBACK_KEYFRAME_SECONDS = 1.0
+
+
+def is_video_file(filename, mimetype=None):
+    """Returns True for uploads that look like a video by mimetype or extension."""
+    if mimetype and mimetype.startswith('video/'):
+        return True
+    return filename.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def _analyse(frame, orb):
+    """Downscales a frame and returns (thumbnail shape, sharpness, ORB features)."""
+    height, width = frame.shape[:2]
+    scale = min(1.0, ANALYSIS_MAX_SIDE / float(max(height, width)))
+    small = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return gray.shape, blur_score(gray), orb.detectAndCompute(gray, None)
+
+
+def _measure_overlap(last_kept, shape, features, matcher):
+    """Returns the overlap of a frame with the last keyframe, or None if it could not be estimated."""
+    result = estimate_overlap(last_kept[1], features, last_kept[0], shape, matcher)
+    if result['homography'] is None:
+        return None
+    return result['overlap']
+
+
+def extract_keyframes(video_path, output_dir, frame_step=DEFAULT_FRAME_STEP, max_keyframes=DEFAULT_MAX_KEYFRAMES):
+    """
+    Streams a video and writes the selected keyframes to output_dir as JPEGs.
+
+    Args:
+        video_path (str): Path to the video file.
+        output_dir (str): Directory for the keyframe images (created if missing).
+        frame_step (int): Analyse every Nth frame; the others are grabbed without being decoded to BGR.
+        max_keyframes (int): Upper bound on the number of keyframes written.
+
+    Returns:
+        tuple: (list, bool)
+            - Paths of the written keyframes, in video order.
+            - True if max_keyframes was reached before the end of the video, so the rest of it was not used.
+    """
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise Exception(f"Could not open video file: {os.path.basename(video_path)}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    orb = cv2.ORB_create(nfeatures=ORB_FEATURES)
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    base_name = os.path.splitext(os.path.basename(video_path))[0]
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    fallback_interval = max(fps * FALLBACK_KEYFRAME_SECONDS, frame_count / max(1, max_keyframes - 1), frame_step)
+
+    keyframe_paths = []
+    last_kept = None   # (shape, features, frame index) of the last written keyframe
+    candidate = None   # (sharpness, frame, shape, features, frame index) - best frame to keep next
+    frame_index = -1
+    unmeasured = 0
+
+    def keep(frame, shape, features, index):
+        path = os.path.join(output_dir, f"{base_name}_key{len(keyframe_paths) + 1:03d}.jpg")
+        cv2.imwrite(path, frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        keyframe_paths.append(path)
+        return shape, features, index
+
+    try:
+        while len(keyframe_paths) < max_keyframes:
+            if not capture.grab():
+                break
+            frame_index += 1
+            if frame_index % max(1, frame_step):
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+
+            shape, sharpness, features = _analyse(frame, orb)
+            if sharpness < MIN_SHARPNESS:
+                continue
+
+            if last_kept is None:
+                last_kept = keep(frame, shape, features, frame_index)
+                continue
+
+            overlap = _measure_overlap(last_kept, shape, features, matcher)
+            if overlap is None:
+                # No estimate is not low overlap: space keyframes in time, keeping the sharpest
+                # frame from the second half of each interval.
+                unmeasured += 1
+                since = frame_index - last_kept[2]
+                if since >= fallback_interval / 2 and (candidate is None or sharpness > candidate[0]):
+                    candidate = (sharpness, frame, shape, features, frame_index)
+                if since >= fallback_interval and candidate is not None:
+                    last_kept = keep(*candidate[1:])
+                    candidate = None
+                continue
+
+            if overlap > MAX_OVERLAP:
+                continue  # Still too similar to the last keyframe.
+
+            if overlap >= MIN_OVERLAP:
+                if candidate is None or sharpness > candidate[0]:
+                    candidate = (sharpness, frame, shape, features, frame_index)
+                continue
+
+            # Overlap dropped below MIN_OVERLAP: commit the best frame from the window (or this one if the
+            # camera moved too fast for the window to catch any frame), then measure this frame against it.
+            if candidate is not None:
+                last_kept = keep(*candidate[1:])
+                candidate = None
+                if len(keyframe_paths) >= max_keyframes:
+                    break
+                overlap = _measure_overlap(last_kept, shape, features, matcher)
+                if overlap is None or MIN_OVERLAP <= overlap <= MAX_OVERLAP:
+                    candidate = (sharpness, frame, shape, features, frame_index)
+                    continue
+                if overlap > MAX_OVERLAP:
+                    continue
+            last_kept = keep(frame, shape, features, frame_index)
+
+        # The tail of the pan after the last keyframe.
+        if candidate is not None and len(keyframe_paths) < max_keyframes:
+            keep(*candidate[1:])
+
+        truncated = len(keyframe_paths) >= max_keyframes and capture.grab()
+        if truncated:
+            total = f" of {frame_count}" if frame_count else ""
+            print(f"⚠️ Keyframe limit of {max_keyframes} reached at frame {frame_index + 1}{total} of {os.path.basename(video_path)}; the rest of the video was not used.")
+        if unmeasured:
+            print(f"ℹ️ Overlap could not be estimated for {unmeasured} analysed frames of {os.path.basename(video_path)}; those keyframes were spaced by time.")
+    finally:
+        capture.release()
+
+    return keyframe_paths, truncated
@@ -1,32 +1,50 @@
 import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
-import { supabase } from '../Supabase'; // ✅ Ensure correct import path
+
+const BACKEND_URL = "https://virtual-tour-creater-backend.onrender.com";
+const PAGE_SIZE = 24;
 
 const AllToursPage = () => {
   const [tours, setTours] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
 
-  useEffect(() => {
-    const fetchTours = async () => {
-      setLoading(true);
-      const { data, error } = await supabase
-        .from('tour')
-        .select('tour_id, tour_name')
-        .order('created_at', { ascending: false });
+  // One request per page: the backend returns counts and thumbnails alongside each tour.
+  const fetchTours = async (cursor = null) => {
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    if (cursor) params.set('cursor', cursor);
 
-      if (error) {
-        console.error("❌ Error fetching tours:", error.message);
-        setLoading(false);
+    try {
+      const response = await fetch(`${BACKEND_URL}/tours?${params.toString()}`);
+      const data = await response.json();
+      if (!data.success) {
+        console.error("❌ Error fetching tours:", data.error);
         return;
       }
+      setTours((prev) => (cursor ? [...prev, ...data.tours] : data.tours));
+      setNextCursor(data.nextCursor);
+    } catch (err) {
+      console.error("❌ Error fetching tours:", err.message);
+    }
+  };
 
-      setTours(data || []);
+  useEffect(() => {
+    const loadFirstPage = async () => {
+      setLoading(true);
+      await fetchTours();
       setLoading(false);
     };
 
-    fetchTours();
+    loadFirstPage();
   }, []);
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    await fetchTours(nextCursor);
+    setLoadingMore(false);
+  };
+
   return (
     <div style={styles.page}>
       <div style={styles.container}>
@@ -40,22 +58,39 @@ const AllToursPage = () => {
         ) : (
           <div className="row g-4 justify-content-center">
             {tours.map((tour, index) => (
-              <div key={tour.tour_id} className="col-md-6 col-lg-4">
+              <div key={tour.tourId} className="col-md-6 col-lg-4">
                 <div
                   className="card h-100 shadow-sm border-0"
                   style={styles.card}
                   onMouseOver={(e) => e.currentTarget.style.transform = "scale(1.02)"}
                   onMouseOut={(e) => e.currentTarget.style.transform = "scale(1)"}
                 >
+                  {tour.thumbnailUrl && (
+                    <img
+                      src={tour.thumbnailUrl}
+                      alt={tour.tourName || 'Tour thumbnail'}
+                      loading="lazy"
+                      className="card-img-top"
+                      style={styles.thumbnail}
+                    />
+                  )}
                   <div className="card-body text-center">
                     <h5 className="card-title text-primary fw-semibold">
-                      {tour.tour_name || `Untitled Tour #${index + 1}`}
+                      {tour.tourName || `Untitled Tour #${index + 1}`}
                     </h5>
+                    <p className="text-muted mb-2">
+                      {tour.roomCount} rooms · {tour.markerCount} hotspots · {tour.tooltipCount} tooltips
+                    </p>
                     <p className="text-muted mb-3">
                       <span className="badge bg-light text-dark">ID:</span>{' '}
-                      <code>{tour.tour_id}</code>
+                      <code>{tour.tourId}</code>
                     </p>
-                    <Link to={`/tour/${tour.tour_id}`} className="btn btn-outline-primary w-100">
+                    {tour.lastModified && (
+                      <p className="text-muted small mb-3">
+                        Updated {new Date(tour.lastModified).toLocaleDateString()}
+                      </p>
+                    )}
+                    <Link to={`/tour/${tour.tourId}`} className="btn btn-outline-primary w-100">
                       ▶️ View Tour
                     </Link>
                   </div>
@@ -64,6 +99,14 @@ const AllToursPage = () => {
             ))}
           </div>
         )}
+
+        {!loading && nextCursor && (
+          <div className="text-center mt-4">
+            <button className="btn btn-primary" onClick={handleLoadMore} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load more tours'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -103,6 +146,11 @@ const styles = {
   card: {
     transition: 'transform 0.2s ease, box-shadow 0.2s ease',
     borderRadius: '14px',
+    overflow: 'hidden',
+  },
+  thumbnail: {
+    height: '160px',
+    objectFit: 'cover',
   },
 };
 
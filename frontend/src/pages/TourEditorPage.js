@@ -56,6 +56,9 @@ const TourEditorPage = () => {
   const [isPlacingNewTooltip, setIsPlacingNewTooltip] = useState(false);
   const [newTooltipPosition, setNewTooltipPosition] = useState(null); // Temporary position for a new tooltip
 
+  // --- Per-room revisions of markers/tooltips, sent as baseRevision with every change-set ---
+  const [revisions, setRevisions] = useState({});
+
   // --- Audio States ---
   const [recordingRoom, setRecordingRoom] = useState(null); // Tracks which room is currently recording
   const [recordedAudio, setRecordedAudio] = useState({}); // Stores recorded audio blob and URL per room
@@ -128,6 +131,7 @@ const TourEditorPage = () => {
           setStartRoom(data.startRoom || roomList[0]);
           setMarkers(data.markers || {});
           setTooltips(data.tooltips || {});
+          setRevisions(data.revisions || {});
           // Initialize recordedAudio with URLs fetched from backend
           setRecordedAudio(data.audioUrls ? Object.fromEntries(
             Object.entries(data.audioUrls).map(([roomName, url]) => [roomName, { url, blob: null }])
@@ -202,13 +206,17 @@ const TourEditorPage = () => {
         if (tourData.success) {
             setMarkers(tourData.markers || {});
             setTooltips(tourData.tooltips || {});
+            setRevisions(tourData.revisions || {});
             setRecordedAudio(tourData.audioUrls ? Object.fromEntries(
                 Object.entries(tourData.audioUrls).map(([roomName, url]) => [roomName, { url, blob: null }])
             ) : {});
         }
 
 
-        alert("✅ Room updated successfully! Panoramas, markers, and tooltips for this room have been reset.");
+        alert("✅ Room updated successfully! Panoramas, markers, and tooltips for this room have been reset." +
+          (res.data.truncatedVideos?.length
+            ? `\n⚠️ Only the start of ${res.data.truncatedVideos.join(", ")} was used (keyframe limit reached).`
+            : ""));
         setShowFileInput((prev) => ({ ...prev, [room]: false }));
         setSelectedFiles((prev) => ({ ...prev, [room]: [] }));
       } else {
@@ -374,6 +382,7 @@ const TourEditorPage = () => {
             setStartRoom(tourData.startRoom);
             setMarkers(tourData.markers || {});
             setTooltips(tourData.tooltips || {});
+            setRevisions(tourData.revisions || {});
             setRecordedAudio(tourData.audioUrls ? Object.fromEntries(
                 Object.entries(tourData.audioUrls).map(([roomName, url]) => [roomName, { url, blob: null }])
             ) : {});
@@ -416,6 +425,7 @@ const TourEditorPage = () => {
               setStartRoom(tourData.startRoom);
               setMarkers(tourData.markers || {});
               setTooltips(tourData.tooltips || {});
+              setRevisions(tourData.revisions || {});
               setRecordedAudio(tourData.audioUrls ? Object.fromEntries(
                 Object.entries(tourData.audioUrls).map(([roomName, url]) => [roomName, { url, blob: null }])
               ) : {});
@@ -428,6 +438,7 @@ const TourEditorPage = () => {
             setStartRoom(null);
             setMarkers({});
             setTooltips({});
+            setRevisions({});
             setRecordedAudio({});
           }
 
@@ -448,7 +459,26 @@ const TourEditorPage = () => {
   };
 
 
-  // --- Marker Add/Remove Logic (Direct Supabase calls, assuming no complex backend logic needed) ---
+  // --- Change-set saves: only the edited markers/tooltips are sent, checked against the room's revision ---
+  const saveChangeSet = async (kind, room, changes) => {
+    const isMarkers = kind === 'markers';
+    try {
+      const res = await axios.post(`${BACKEND_URL}/${isMarkers ? 'save-markers' : 'save-tooltips'}`, {
+        tourId,
+        [isMarkers ? 'roomFrom' : 'roomName']: room,
+        baseRevision: revisions[room]?.[kind] || 0,
+        changes,
+      });
+      setRevisions((prev) => ({ ...prev, [room]: { ...prev[room], [kind]: res.data.revision } }));
+    } catch (err) {
+      if (err.response?.status === 409) {
+        throw new Error(`The ${kind} of "${room}" were changed elsewhere since this page was loaded. Reload the page to get the latest version.`);
+      }
+      throw new Error(err.response?.data?.error || err.message);
+    }
+  };
+
+  // --- Marker Add/Remove Logic ---
   const handleAddMarker = async () => {
     if (!selectedRoomFrom || !selectedRoomTo) return alert("Please select both 'From' and 'To' rooms.");
     if (selectedRoomFrom === selectedRoomTo) return alert("A room cannot link to itself. Please choose a different destination room.");
@@ -473,8 +503,9 @@ const TourEditorPage = () => {
     };
 
     try {
-      const { error } = await supabase.from('markers').insert([newMarker]);
-      if (error) throw error;
+      await saveChangeSet('markers', selectedRoomFrom, {
+        added: [{ id: newMarkerId, linkTo: newMarker.to_room, position_x: newMarker.position_x, position_y: newMarker.position_y }],
+      });
 
       setMarkers((prev) => {
         const updated = { ...prev };
@@ -497,15 +528,10 @@ const TourEditorPage = () => {
   const handleRemoveMarker = async (room, linkToRoom) => {
     showConfirmation(`Are you sure you want to remove the marker from "${room}" linked to "${linkToRoom}"?`, async () => {
       try {
-        const { error } = await supabase.from('markers')
-          .delete()
-          .eq('tour_id', tourId)
-          .eq('from_room', room)
-          .eq('to_room', linkToRoom)
-          .eq('position_x', FIXED_MARKER_POSITION.x)
-          .eq('position_y', FIXED_MARKER_POSITION.y);
-
-        if (error) throw error;
+        const removedIds = (markers[room] || [])
+          .filter((marker) => marker.linkTo === linkToRoom && marker.position.x === FIXED_MARKER_POSITION.x && marker.position.y === FIXED_MARKER_POSITION.y)
+          .map((marker) => marker.id);
+        await saveChangeSet('markers', room, { removed: removedIds });
 
         setMarkers((prev) => {
           const updated = { ...prev };
@@ -524,7 +550,7 @@ const TourEditorPage = () => {
     });
   };
 
-  // --- Tooltip Handlers (Direct Supabase calls, assuming no complex backend logic needed) ---
+  // --- Tooltip Handlers ---
   const handleSelectRoomForTooltipEdit = (room) => {
     setActiveTooltipRoom(room);
     setEditingTooltipId(null);
@@ -565,8 +591,9 @@ const TourEditorPage = () => {
       };
 
       try {
-        const { error } = await supabase.from('tooltips').insert([newTooltip]);
-        if (error) throw error;
+        await saveChangeSet('tooltips', activeTooltipRoom, {
+          added: [{ id: newTooltipId, content: newTooltip.content, position_x: x, position_y: y }],
+        });
 
         setTooltips((prev) => {
           const updated = { ...prev };
@@ -588,10 +615,10 @@ const TourEditorPage = () => {
       }
     } else if (editingTooltipId) {
       try {
-        const { error } = await supabase.from('tooltips')
-          .update({ position_x: x, position_y: y })
-          .eq('tooltip_id', editingTooltipId);
-        if (error) throw error;
+        const tooltip = (tooltips[activeTooltipRoom] || []).find((t) => t.id === editingTooltipId);
+        await saveChangeSet('tooltips', activeTooltipRoom, {
+          updated: [{ id: editingTooltipId, content: tooltip?.content || '', position_x: x, position_y: y }],
+        });
 
         setTooltips((prev) => {
           const updated = { ...prev };
@@ -627,10 +654,10 @@ const TourEditorPage = () => {
     if (!editingTooltipId) return;
 
     try {
-      const { error } = await supabase.from('tooltips')
-        .update({ content: tooltipContentInput.trim() })
-        .eq('tooltip_id', editingTooltipId);
-      if (error) throw error;
+      const tooltip = (tooltips[activeTooltipRoom] || []).find((t) => t.id === editingTooltipId);
+      await saveChangeSet('tooltips', activeTooltipRoom, {
+        updated: [{ id: editingTooltipId, content: tooltipContentInput.trim(), position_x: tooltip?.position.x, position_y: tooltip?.position.y }],
+      });
 
       setTooltips((prev) => {
         const updated = { ...prev };
@@ -651,10 +678,7 @@ const TourEditorPage = () => {
   const handleRemoveTooltip = async (tooltipId) => {
     showConfirmation("Are you sure you want to remove this tooltip?", async () => {
       try {
-        const { error } = await supabase.from('tooltips')
-          .delete()
-          .eq('tooltip_id', tooltipId);
-        if (error) throw error;
+        await saveChangeSet('tooltips', activeTooltipRoom, { removed: [tooltipId] });
 
         setTooltips((prev) => {
           const updated = { ...prev };
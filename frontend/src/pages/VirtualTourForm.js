@@ -3,16 +3,23 @@ import { useNavigate } from "react-router-dom";
 import axios from "axios";
 import { v4 as uuidv4 } from 'uuid';
 
+const BACKEND_URL = "https://virtual-tour-creater-backend.onrender.com";
+
 const VirtualTourForm = () => {
   const [rooms, setRooms] = useState([]);
   const [roomImages, setRoomImages] = useState({});
   const [tourName, setTourName] = useState("");
+  const [progressEvents, setProgressEvents] = useState([]);
   const navigate = useNavigate();
   const tourId = uuidv4();
 
   const handleImageUpload = (e, roomName) => {
     const selectedFiles = Array.from(e.target.files);
     const previewPromises = selectedFiles.map((file) => {
+      // Walkthrough videos are previewed via an object URL instead of being read into memory.
+      if (file.type.startsWith("video/")) {
+        return Promise.resolve({ file, preview: URL.createObjectURL(file), isVideo: true });
+      }
       return new Promise((resolve, reject) => {
         const reader = new FileReader();
         reader.onload = (e) => resolve({ file, preview: e.target.result });
@@ -64,10 +71,27 @@ const VirtualTourForm = () => {
       });
     });
 
+    // Stream per-room stage updates while the backend stitches.
+    setProgressEvents([]);
+    const progressSource = new EventSource(`${BACKEND_URL}/stitch-progress/${tourId}`);
+    progressSource.addEventListener("progress", (event) => {
+      const data = JSON.parse(event.data);
+      setProgressEvents((prev) => [...prev, data]);
+      if (data.stage === "done" || data.stage === "failed") {
+        progressSource.close();
+      }
+    });
+
     try {
-      const response = await axios.post("https://virtual-tour-creater-backend.onrender.com/stitch", formData);
+      const response = await axios.post(`${BACKEND_URL}/stitch`, formData);
 
       if (response.data.success) {
+        const truncated = Object.entries(response.data.truncatedVideos || {});
+        if (truncated.length > 0) {
+          alert(`⚠️ Only the start of these videos was used (keyframe limit reached): ${truncated
+            .map(([room, videos]) => `${room}: ${videos.join(", ")}`)
+            .join("; ")}. Re-upload a shorter, slower pan if part of the room is missing.`);
+        }
         navigate(`/editor/${tourId}`);
       } else {
         alert("Stitching failed.");
@@ -75,6 +99,8 @@ const VirtualTourForm = () => {
     } catch (err) {
       console.error("Error during panorama generation:", err);
       alert("Failed to generate tour. Check backend connection.");
+    } finally {
+      progressSource.close();
     }
   };
 
@@ -83,7 +109,7 @@ const VirtualTourForm = () => {
       <div style={{ maxWidth: "880px", margin: "0 auto", background: "#fff", padding: "40px", borderRadius: "20px", boxShadow: "0 6px 24px rgba(0,0,0,0.08)" }}>
         <h1 style={{ textAlign: "center", marginBottom: "20px", fontWeight: "600" }}>Build Your Virtual Tour</h1>
         <p style={{ textAlign: "center", color: "#666", marginBottom: "30px" }}>
-          Upload room images and we’ll stitch them into interactive panoramas.
+          Upload room images (or a slow pan video of each room) and we’ll stitch them into interactive panoramas.
         </p>
 
         {/* Tour Name Input */}
@@ -116,7 +142,7 @@ const VirtualTourForm = () => {
             <input
               type="file"
               multiple
-              accept="image/*"
+              accept="image/*,video/*"
               onChange={(e) => handleImageUpload(e, room)}
               style={{
                 marginBottom: "20px",
@@ -139,15 +165,27 @@ const VirtualTourForm = () => {
                     border: "1px solid #ddd",
                     background: "#fafafa"
                   }}>
-                    <img
-                      src={item.preview}
-                      alt={`Preview ${room} - ${i}`}
-                      style={{
-                        width: "100%",
-                        height: "100%",
-                        objectFit: "cover"
-                      }}
-                    />
+                    {item.isVideo ? (
+                      <video
+                        src={item.preview}
+                        muted
+                        style={{
+                          width: "100%",
+                          height: "100%",
+                          objectFit: "cover"
+                        }}
+                      />
+                    ) : (
+                      <img
+                        src={item.preview}
+                        alt={`Preview ${room} - ${i}`}
+                        style={{
+                          width: "100%",
+                          height: "100%",
+                          objectFit: "cover"
+                        }}
+                      />
+                    )}
                     <button
                       onClick={() => handleRemoveImage(room, i)}
                       style={{
@@ -171,6 +209,21 @@ const VirtualTourForm = () => {
           </div>
         ))}
 
+        {progressEvents.length > 0 && (
+          <div style={{ background: "#f4f7ff", border: "1px solid #dbe4ff", borderRadius: "10px", padding: "16px 20px", marginTop: "20px" }}>
+            <h5 style={{ marginBottom: "10px", fontWeight: "600" }}>Stitching progress</h5>
+            <ul style={{ listStyle: "none", padding: 0, margin: 0, fontSize: "14px", color: "#444" }}>
+              {progressEvents.map((event) => (
+                <li key={event.id}>
+                  {event.room ? `${event.room}: ` : ""}{event.stage}
+                  {event.room && event.seconds !== undefined ? ` (${event.seconds.toFixed(1)}s)` : ""}
+                  {event.error ? ` – ${event.error}` : ""}
+                </li>
+              ))}
+            </ul>
+          </div>
+        )}
+
         <div style={{ display: "flex", flexDirection: "column", gap: "20px", marginTop: "30px" }}>
           <button
             onClick={handleAddRoom}